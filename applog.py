@@ -0,0 +1,52 @@
+import logging
+import threading
+import time
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most `burst` records per message template every `period` seconds.
+
+    Records are grouped by logger, level and the unformatted message, so
+    "Error fetching %s" from a thousand failing sources counts as one kind
+    of message. The first record after a quiet window says how many of its
+    kind were dropped.
+    """
+
+    def __init__(self, period=60, burst=10):
+        super().__init__()
+        self.period = period
+        self.burst = burst
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            started, passed, dropped = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.period:
+                started, passed = now, 0
+            if passed >= self.burst:
+                self._windows[key] = (started, passed, dropped + 1)
+                return False
+            self._windows[key] = (started, passed + 1, 0)
+
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} similar messages suppressed)"
+        return True
+
+
+def configure_logging(config):
+    """Send the app's loggers (instanews.*) to stderr at LOG_LEVEL, rate limited."""
+    logger = logging.getLogger('instanews')
+    logger.setLevel(config['LOG_LEVEL'])
+    logger.propagate = False
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handler.addFilter(RateLimitFilter(config['LOG_RATE_PERIOD'], config['LOG_RATE_BURST']))
+        logger.addHandler(handler)
+    return logger
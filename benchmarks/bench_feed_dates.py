@@ -0,0 +1,127 @@
+"""
+Entry date parsing: feeddates vs. the strptime loops it replaced.
+
+    python benchmarks/bench_feed_dates.py [--repeat 20]
+
+Parses a corpus of date strings in the shapes real feeds publish them
+(RSS pubDate with offsets and zone names, Atom/ISO 8601 with and without
+fractions, and a few odd site-specific formats) and reports the time per
+date and how many dates each parser gets wrong once offsets are applied,
+then the cost per feedparser entry, where feeddates reads the struct
+feedparser already parsed. The legacy rows reproduce get_entry_date.
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feedparser
+from feeddates import DateParser, feedparser_parse_date
+
+# (date string, expected UTC value)
+CORPUS = [
+    ('Tue, 28 Jan 2025 15:38:59 +0200', datetime(2025, 1, 28, 13, 38, 59)),
+    ('Mon, 27 Jan 2025 21:04:25 +0000', datetime(2025, 1, 27, 21, 4, 25)),
+    ('Mon, 27 Jan 2025 21:04:25 GMT', datetime(2025, 1, 27, 21, 4, 25)),
+    ('Wed, 29 Jan 2025 08:15:00 EST', datetime(2025, 1, 29, 13, 15, 0)),
+    ('Thu, 30 Jan 2025 07:00:00 -0800', datetime(2025, 1, 30, 15, 0, 0)),
+    ('Thu, 30 Jan 2025 07:00:00 CEST', datetime(2025, 1, 30, 5, 0, 0)),
+    ('30 Jan 2025 07:00:00 +0100', datetime(2025, 1, 30, 6, 0, 0)),
+    ('Fri, 31 Jan 2025 9:05:00 +0200', datetime(2025, 1, 31, 7, 5, 0)),
+    ('Sat, 01 Feb 2025 10:30 +0100', datetime(2025, 2, 1, 9, 30, 0)),
+    ('2025-01-28T15:38:59+02:00', datetime(2025, 1, 28, 13, 38, 59)),
+    ('2025-01-28T15:38:59Z', datetime(2025, 1, 28, 15, 38, 59)),
+    ('2025-01-28T15:38:59.123Z', datetime(2025, 1, 28, 15, 38, 59, 123000)),
+    ('2025-01-28T15:38:59.123456+01:00', datetime(2025, 1, 28, 14, 38, 59, 123456)),
+    ('2025-01-28T15:38:59+0200', datetime(2025, 1, 28, 13, 38, 59)),
+    ('2025-01-28 15:38:59', datetime(2025, 1, 28, 15, 38, 59)),
+    ('2025-01-28', datetime(2025, 1, 28)),
+    ('28.01.2025 15:38', datetime(2025, 1, 28, 15, 38)),
+    ('January 28, 2025 15:38:59', datetime(2025, 1, 28, 15, 38, 59)),
+]
+
+LEGACY_FORMATS = [
+    '%a, %d %b %Y %H:%M:%S %z',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%dT%H:%M:%SZ',
+    '%Y-%m-%d %H:%M:%S',
+]
+
+
+def legacy_entry_date(entry):
+    for date_field in ['published', 'updated', 'created']:
+        if hasattr(entry, date_field):
+            return legacy_parse(getattr(entry, date_field))
+    return datetime.utcnow()
+
+
+def legacy_parse(date_str):
+    for date_format in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(date_str, date_format)
+        except ValueError:
+            continue
+    return datetime.utcnow()
+
+
+def as_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    strings = [value for value, _ in CORPUS]
+    date_parser = DateParser()
+
+    def run_legacy():
+        return [legacy_parse(value) for value in strings]
+
+    # Every string stands for a different feed, as formats are consistent within a feed
+    feed_urls = [f'https://news{n}.example.com/feed' for n in range(len(strings))]
+
+    def run_feeddates():
+        return [date_parser.parse(value, feed_url) for value, feed_url in zip(strings, feed_urls)]
+
+    def run_feedparser():
+        return [feedparser_parse_date(value) for value in strings]
+
+    candidates = [('legacy strptime loop', run_legacy), ('feedparser._parse_date', run_feedparser),
+                  ('feeddates', run_feeddates)]
+
+    print(f"{len(strings)} date strings\n")
+    print(f"{'parser':<24}{'us/date':>10}{'wrong':>8}")
+    for name, func in candidates:
+        results = func()
+        if name == 'feedparser._parse_date':
+            results = [datetime(*struct[:6]) if struct else None for struct in results]
+        wrong = sum(1 for result, (_, expected) in zip(results, CORPUS)
+                    if as_utc(result) is None or abs((as_utc(result) - expected).total_seconds()) >= 1)
+        best = min(timeit.repeat(func, number=20, repeat=args.repeat)) / 20
+        print(f"{name:<24}{best / len(strings) * 1e6:>10.1f}{wrong:>8}")
+
+    # Whole entries: feedparser has already parsed most of these dates while reading the feed
+    items = ''.join(f'<item><title>{n}</title><pubDate>{value}</pubDate></item>' for n, value in enumerate(strings))
+    entries = feedparser.parse(f'<rss version="2.0"><channel>{items}</channel></rss>').entries
+    print(f"\n{'per entry':<24}{'us/entry':>10}")
+    for name, func in [('legacy get_entry_date', lambda: [legacy_entry_date(entry) for entry in entries]),
+                       ('feeddates.entry_date', lambda: [date_parser.entry_date(entry, feed_url)
+                                                         for entry, feed_url in zip(entries, feed_urls)])]:
+        best = min(timeit.repeat(func, number=20, repeat=args.repeat)) / 20
+        print(f"{name:<24}{best / len(entries) * 1e6:>10.1f}")
+
+    for value, expected in CORPUS:
+        result = date_parser.parse(value)
+        if result is None or abs((result - expected).total_seconds()) >= 1:
+            print(f"  feeddates misread {value!r}: {result}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Connection reuse of the shared HTTP client against the local fake news site.
+
+    python benchmarks/bench_http_client.py [--articles 20] [--latency 0.02]
+
+Fetches the same article pages once with a fresh connection per request
+(plain requests.get) and once through http_client, and reports how many
+TCP connections each needed. Exits non-zero if http_client opened more
+than one connection for back-to-back requests to the same host.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from httpclient import http_client
+from benchmarks.fakeserver import FakeNewsServer
+
+
+def fetch_all(server, urls, get):
+    server.reset_counters()
+    started = time.perf_counter()
+    for url in urls:
+        get(url).raise_for_status()
+    return time.perf_counter() - started, server.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articles', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.02, help='server think time per request (seconds)')
+    args = parser.parse_args()
+
+    server = FakeNewsServer(latency=args.latency).start()
+    urls = [server.url(f'/article/{n}') for n in range(args.articles)]
+    try:
+        plain_time, plain_connections = fetch_all(server, urls, lambda url: requests.get(url, timeout=10))
+        pooled_time, pooled_connections = fetch_all(server, urls, http_client.get)
+    finally:
+        server.stop()
+
+    print(f"{'client':<14}{'requests':>10}{'connections':>13}{'seconds':>10}")
+    print(f"{'requests.get':<14}{len(urls):>10}{plain_connections:>13}{plain_time:>10.3f}")
+    print(f"{'http_client':<14}{len(urls):>10}{pooled_connections:>13}{pooled_time:>10.3f}")
+
+    if pooled_connections > 1:
+        print("❌ http_client did not reuse its connection")
+        return 1
+    print("✅ one warm connection served every request")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
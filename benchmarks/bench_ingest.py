@@ -0,0 +1,274 @@
+"""
+Ingest pipeline and timeline API against local fake news sites.
+
+    python benchmarks/bench_ingest.py [--sources 50] [--users 20] [--follows 10] [--hosts 10]
+                                      [--latency 0.02] [--error-rate 0] [--database-url URL]
+
+Starts --hosts fake news servers (benchmarks/fakeserver.py) sharing
+--sources sites between them, seeds a database with users, their
+subscriptions and a post history shaped like rss_db.sql (titles and
+bodies sampled from its rss_feed_content rows), then measures:
+
+    discovery   discover_feed_url on every site's homepage
+    sweep       process_feeds over every source, then once more
+    images      one resolve_pending_images batch for the posts the sweep queued
+    api         /rssfeeds/api, first page plus --pages more per user, cold then warm cache
+
+For each phase it reports wall time, requests served, SQL statements
+(per source, post or API request), API latency percentiles and the peak
+RSS of the process so far. Without --database-url a throwaway SQLite
+file is used; point it at an empty MariaDB database for numbers that
+compare to production. App settings (FETCH_MAX_WORKERS,
+IMAGE_PER_HOST_INTERVAL, TIMELINE_CACHE_URL, ...) come from the usual
+environment variables.
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakeserver import FakeNewsServer
+
+SQL_VALUE = re.compile(r"'((?:[^'\\]|\\.)*)'|(NULL)|(-?\d+)")
+SQL_ESCAPES = {'n': '\n', 'r': '\r', 't': '\t', '0': '\0'}
+
+
+def dump_posts(path):
+    """(title, content) of every rss_feed_content row in a MariaDB dump like rss_db.sql."""
+    posts = []
+    in_rows = False
+    with open(path, encoding='utf-8') as dump:
+        for line in dump:
+            if line.startswith('INSERT INTO `rss_feed_content`'):
+                in_rows = True
+            elif in_rows and line.startswith('('):
+                values = [
+                    re.sub(r'\\(.)', lambda m: SQL_ESCAPES.get(m.group(1), m.group(1)), match.group(1))
+                    if match.group(1) is not None else None
+                    for match in SQL_VALUE.finditer(line)
+                ]
+                # id, feed_base_url, post_title, post_date, post_content, ...
+                if len(values) > 4 and values[2]:
+                    posts.append((values[2], values[4] or ''))
+            else:
+                in_rows = False
+    return posts
+
+
+class QueryCounter:
+    """Counts SQL statements sent through an engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def allow_fake_sites(app_module):
+    """The fake sites live on loopback, which the SSRF guard rightly refuses; admit them in this process only."""
+    import urlguard
+    is_public_ip, is_valid_public_url = urlguard.is_public_ip, app_module.is_valid_public_url
+    urlguard.is_public_ip = lambda ip: ip == '127.0.0.1' or is_public_ip(ip)
+    app_module.is_valid_public_url = lambda url: url.startswith('http://127.0.0.1:') or is_valid_public_url(url)
+
+
+def seed_database(args, servers, samples):
+    """Users, subscriptions and post history; returns (user ids, source feed URLs, homepage URLs)."""
+    from models import db, User, RSSFeed, RSSFeedContent, IMAGE_DONE, post_url_hash
+    from htmltext import clean_post_content
+
+    rng = random.Random(args.seed)
+    sources, homepages = [], []
+    for k in range(args.sources):
+        server = servers[k % len(servers)]
+        # Every fourth site publishes Atom, the rest RSS
+        sources.append(server.url(f"/s/site{k}/{'atom.xml' if k % 4 == 3 else 'feed.xml'}"))
+        homepages.append(server.url(f'/s/site{k}/'))
+
+    users = [User(username=f'bench{n}', email=f'bench{n}@example.com', password='-') for n in range(args.users)]
+    db.session.add_all(users)
+    db.session.flush()
+    db.session.execute(db.insert(RSSFeed), [
+        {'url': url, 'user_id': user.id}
+        for user in users
+        for url in rng.sample(sources, min(args.follows, len(sources)))
+    ])
+
+    # History is at least a day old, so the sweep's posts are the newest
+    now = datetime.utcnow()
+    rows = []
+    for k, url in enumerate(sources):
+        site = url.rsplit('/', 1)[0]
+        for n in range(args.history):
+            title, content = samples[(k * args.history + n) % len(samples)]
+            post_url = f'{site}/archive/{n}'
+            post_content, post_snippet = clean_post_content(content, base_url=post_url)
+            rows.append({
+                'feed_base_url': url,
+                'post_title': title[:255],
+                'post_date': now - timedelta(days=1, minutes=rng.randrange(30 * 24 * 60)),
+                'post_content': post_content,
+                'post_snippet': post_snippet,
+                'post_featured_image_url': f'{site}/images/archive-{n}.jpg',
+                'image_status': IMAGE_DONE,
+                'post_url': post_url,
+                'post_url_hash': post_url_hash(post_url),
+                'created_at': now,
+                'updated_at': now,
+            })
+    for start in range(0, len(rows), 1000):
+        db.session.execute(db.insert(RSSFeedContent), rows[start:start + 1000])
+    db.session.commit()
+    return [user.id for user in users], sources, homepages
+
+
+def api_latencies(app, user_ids, pages):
+    """Seconds per /rssfeeds/api request while every user scrolls through `pages` pages past the first."""
+    latencies = []
+    for user_id in user_ids:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        cursor = ''
+        for _ in range(pages + 1):
+            started = time.perf_counter()
+            response = client.get('/rssfeeds/api', query_string={'cursor': cursor})
+            latencies.append(time.perf_counter() - started)
+            data = response.get_json()
+            if response.status_code != 200:
+                raise RuntimeError(f"/rssfeeds/api answered {response.status_code}: {data}")
+            if not data['has_more']:
+                break
+            cursor = data['next_cursor']
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sources', type=int, default=50, help='fake news sites (feed sources)')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--follows', type=int, default=10, help='sources each user subscribes to')
+    parser.add_argument('--hosts', type=int, default=10, help='fake servers the sites are spread over')
+    parser.add_argument('--history', type=int, default=100, help='stored posts per source before the sweep')
+    parser.add_argument('--items', type=int, default=20, help='items per feed document')
+    parser.add_argument('--body-size', type=int, default=20000, help='article page size (bytes)')
+    parser.add_argument('--latency', type=float, default=0.02, help='server think time per request (seconds)')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of requests answered with 503')
+    parser.add_argument('--pages', type=int, default=5, help='API pages scrolled per user after the first')
+    parser.add_argument('--database-url', help='empty database to seed (default: a temporary SQLite file)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='keep the app\'s own log output')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-ingest-')
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    import app as app_module
+    from models import db, User, RSSFeedContent, IMAGE_PENDING
+    allow_fake_sites(app_module)
+    app = app_module.app
+    if not args.verbose:
+        logging.getLogger('instanews').setLevel(logging.ERROR)
+
+    servers = [
+        FakeNewsServer(latency=args.latency, feed_items=args.items, body_size=args.body_size,
+                       error_rate=args.error_rate, seed=args.seed + n).start()
+        for n in range(args.hosts)
+    ]
+    quiet = contextlib.nullcontext if args.verbose else lambda: contextlib.redirect_stdout(io.StringIO())
+    results = []
+
+    def measure(name, func, units):
+        for server in servers:
+            server.reset_counters()
+        counter.count = 0
+        started = time.perf_counter()
+        with quiet():
+            latencies = func()
+        elapsed = time.perf_counter() - started
+        results.append({
+            'phase': name,
+            'seconds': elapsed,
+            'requests': sum(server.requests for server in servers),
+            'errors': sum(server.hits.get('error', 0) for server in servers),
+            'queries': counter.count,
+            'queries_per_unit': counter.count / units() if units() else 0,
+            'latencies': latencies,
+            'peak_rss': peak_rss_mb(),
+        })
+
+    try:
+        with app.app_context():
+            db.create_all()
+            if db.session.query(User.id).first():
+                sys.exit("❌ The benchmark seeds its own users; give it an empty database")
+            counter = QueryCounter(db.engine)
+
+            samples = dump_posts(os.path.join(ROOT, 'rss_db.sql'))
+            seed_started = time.perf_counter()
+            user_ids, sources, homepages = seed_database(args, servers, samples)
+            print(f"Seeded {len(user_ids)} users, {len(sources)} sources and {len(sources) * args.history} posts "
+                  f"({len(samples)} sample rows from rss_db.sql) in {time.perf_counter() - seed_started:.1f}s")
+            print(f"Database: {os.environ['DATABASE_URL']}\n")
+
+            from rssfeedparser import discover_feed_url
+            measure('discovery', lambda: [discover_feed_url(url) for url in homepages] and None, lambda: len(sources))
+            measure('sweep', lambda: app_module.process_feeds(None), lambda: len(sources))
+            pending = RSSFeedContent.query.filter_by(image_status=IMAGE_PENDING).count()
+            measure('sweep again', lambda: app_module.process_feeds(None), lambda: len(sources))
+            measure('images', app_module.resolve_pending_images, lambda: min(pending, app.config['IMAGE_BATCH_SIZE']))
+
+            requests_made = []
+
+            def run_api():
+                latencies = api_latencies(app, user_ids, args.pages)
+                requests_made.append(len(latencies))
+                return latencies
+
+            measure('api cold', run_api, lambda: requests_made[-1])
+            measure('api warm', run_api, lambda: requests_made[-1])
+    finally:
+        for server in servers:
+            server.stop()
+
+    print(f"{'phase':<13}{'seconds':>9}{'requests':>10}{'errors':>8}{'SQL':>8}{'SQL/unit':>10}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'peak RSS MB':>13}")
+    for result in results:
+        latencies = result['latencies']
+        if latencies and len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100)
+            p50, p99 = f"{cuts[49] * 1000:.1f}", f"{cuts[98] * 1000:.1f}"
+        else:
+            p50 = p99 = '-'
+        print(f"{result['phase']:<13}{result['seconds']:>9.2f}{result['requests']:>10}{result['errors']:>8}"
+              f"{result['queries']:>8}{result['queries_per_unit']:>10.1f}{p50:>9}{p99:>9}{result['peak_rss']:>13.0f}")
+    print("\nSQL/unit is per source for discovery and sweeps, per post for images, per request for the API.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Head metadata extraction: single-pass pagemeta scan vs. a BeautifulSoup tree.
+
+    python benchmarks/bench_page_meta.py [--repeat 20]
+
+For sample article pages of growing size, times the two lookups the fetch
+pipeline makes: the featured image of an article (og:image and friends,
+else the first article image) and the feed/icon links of a homepage.
+The BeautifulSoup columns reproduce the code these lookups used before.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from pagemeta import scan_html, IMAGE, FULL
+
+
+def sample_page(paragraphs, meta_image=True):
+    """A news article page shaped like the ones feeds link to: a busy head, navigation, article, footer."""
+    head = ['<meta charset="utf-8"><title>Sample article</title>']
+    head += [f'<meta name="keyword-{n}" content="value {n}">' for n in range(30)]
+    head += [f'<link rel="stylesheet" href="/css/{n}.css">' for n in range(10)]
+    head.append('<script>window.dataLayer = [' + ','.join(f'{{"k{n}": {n}}}' for n in range(200)) + '];</script>')
+    if meta_image:
+        head.append('<meta property="og:image" content="https://news.example.com/img/lead.jpg">')
+        head.append('<meta name="twitter:image" content="https://news.example.com/img/lead-tw.jpg">')
+    head.append('<link rel="alternate" type="application/rss+xml" href="/rss.xml">')
+    head.append('<link rel="icon" href="/favicon.png">')
+
+    nav = '<nav>' + ''.join(f'<a href="/section/{n}">Section {n}</a>' for n in range(40)) + '<a href="/feed">RSS</a></nav>'
+    article = '<article><h1>Headline</h1><img src="/img/lead.jpg">' + ''.join(
+        f'<p>Paragraph {n} with <a href="/story/{n}">a link</a> and <b>some</b> <i>inline</i> markup.</p>'
+        for n in range(paragraphs)
+    ) + '</article>'
+    footer = '<footer>' + ''.join(f'<a href="/about/{n}">About {n}</a>' for n in range(60)) + '</footer>'
+    return f'<!DOCTYPE html><html><head>{"".join(head)}</head><body>{nav}{article}{footer}</body></html>'
+
+
+def bs4_article_image(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    tag = soup.find('meta', property='og:image') or \
+        soup.find('meta', attrs={'name': 'og:image'}) or \
+        soup.find('meta', attrs={'name': 'twitter:image'}) or \
+        soup.find('meta', property='article:image')
+    if tag and tag.get('content'):
+        return tag['content']
+    article = soup.find('article') or soup.find('main') or soup
+    img = article.find('img')
+    return img.get('src') if img else None
+
+
+def bs4_site_links(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    feed_type = lambda t: t and ('rss' in t.lower() or 'atom' in t.lower() or 'xml' in t.lower())
+    links = soup.find_all('link', type=feed_type)
+    links.extend(soup.find_all('a', href=lambda h: h and ('rss' in h.lower() or 'feed' in h.lower() or 'atom' in h.lower())))
+    icon = soup.find('link', rel='icon')
+    return [link.get('href') for link in links], icon.get('href') if icon else None
+
+
+def pagemeta_article_image(html):
+    page = scan_html(html, IMAGE)
+    return page.meta_image or page.article_image or page.first_image
+
+
+def pagemeta_site_links(html):
+    page = scan_html(html, FULL)
+    return page.feed_links + page.anchor_feed_links, page.icon_links[0] if page.icon_links else None
+
+
+def best_ms(func, html, repeat):
+    return min(timeit.repeat(lambda: func(html), number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    pages = [
+        ('small', sample_page(10)),
+        ('medium', sample_page(100)),
+        ('large', sample_page(1000)),
+        ('large, no meta', sample_page(1000, meta_image=False)),
+    ]
+
+    print(f"{'page':<16}{'KB':>6}  {'image bs4':>10}{'pagemeta':>10}{'x':>8}  {'links bs4':>10}{'pagemeta':>10}{'x':>8}")
+    for name, html in pages:
+        assert bs4_article_image(html) == pagemeta_article_image(html)
+        assert bs4_site_links(html) == pagemeta_site_links(html)
+
+        image_bs4 = best_ms(bs4_article_image, html, args.repeat)
+        image_scan = best_ms(pagemeta_article_image, html, args.repeat)
+        links_bs4 = best_ms(bs4_site_links, html, args.repeat)
+        links_scan = best_ms(pagemeta_site_links, html, args.repeat)
+        print(f"{name:<16}{len(html) // 1024:>6}  {image_bs4:>9.2f}ms{image_scan:>8.2f}ms{image_bs4 / image_scan:>7.1f}x"
+              f"  {links_bs4:>9.2f}ms{links_scan:>8.2f}ms{links_bs4 / links_scan:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Local fake news site for exercising the fetch pipeline without the network.
+
+    server = FakeNewsServer(latency=0.02).start()
+    server.url('/feed.xml')    # RSS feed linking to /article/<n>
+    server.url('/s/daily/atom.xml')  # Atom feed of another site on the same server
+    server.connections         # TCP connections accepted so far
+    server.stop()
+
+Serves HTTP/1.1 with keep-alive, gzip when the client accepts it, and
+counts connections and requests so callers can check connection reuse.
+Any path can be prefixed with /s/<site>/ to address one of many sites
+sharing the server; `error_rate` answers that share of requests with 503.
+"""
+import gzip
+import random
+import re
+import socket
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def rss_document(base_url, count=20, now=None):
+    now = now or datetime.now(timezone.utc)
+    items = ''.join(
+        f"<item><title>Article {n}</title><link>{base_url}/article/{n}</link>"
+        f"<description>&lt;p&gt;Summary of article {n}&lt;/p&gt;</description>"
+        f"<pubDate>{format_datetime(now - timedelta(minutes=15 * n))}</pubDate></item>"
+        for n in range(count)
+    )
+    return (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+            f'<title>Fake News</title><link>{base_url}/</link>{items}</channel></rss>')
+
+
+def atom_document(base_url, count=20, now=None):
+    now = now or datetime.now(timezone.utc)
+    entries = ''.join(
+        f'<entry><title>Article {n}</title><link href="{base_url}/article/{n}"/>'
+        f'<id>{base_url}/article/{n}</id>'
+        f'<updated>{(now - timedelta(minutes=15 * n)).isoformat(timespec="seconds")}</updated>'
+        f'<summary type="html">&lt;p&gt;Summary of article {n}&lt;/p&gt;</summary></entry>'
+        for n in range(count)
+    )
+    return (f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+            f'<title>Fake News</title><link href="{base_url}/"/><id>{base_url}/</id>'
+            f'<updated>{now.isoformat(timespec="seconds")}</updated>{entries}</feed>')
+
+
+def article_document(base_url, n, body_size=20000):
+    filler = '<p>' + 'Lorem ipsum dolor sit amet. ' * (body_size // 28) + '</p>'
+    return (f'<!DOCTYPE html><html><head><title>Article {n}</title>'
+            f'<meta property="og:image" content="{base_url}/images/{n}.jpg">'
+            f'<link rel="alternate" type="application/rss+xml" href="{base_url}/feed.xml">'
+            f'<link rel="icon" href="{base_url}/favicon.ico"></head>'
+            f'<body><h1>Article {n}</h1>{filler}</body></html>')
+
+
+SITE_PREFIX = re.compile(r'^(/s/[^/]+)(/.*)?$')
+
+
+class FakeNewsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Like real servers: no Nagle delay between the header and body writes
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def send_empty(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            failed = server.error_rate and server.random.random() < server.error_rate
+        if server.latency:
+            time.sleep(server.latency)
+        if failed:
+            server.count('error')
+            self.send_empty(503)
+            return
+
+        base_url = f"http://{self.headers.get('Host')}"
+        path = self.path.split('?', 1)[0]
+        site = SITE_PREFIX.match(path)
+        if site:
+            base_url += site.group(1)
+            path = site.group(2) or '/'
+
+        if path in ('/', '/index.html'):
+            kind, body, content_type = 'page', article_document(base_url, 'index', server.body_size), 'text/html'
+        elif path == '/feed.xml':
+            kind, body, content_type = 'feed', rss_document(base_url, server.feed_items), 'application/rss+xml'
+        elif path == '/atom.xml':
+            kind, body, content_type = 'feed', atom_document(base_url, server.feed_items), 'application/atom+xml'
+        elif path.startswith('/article/'):
+            kind, body, content_type = 'article', article_document(base_url, path.rsplit('/', 1)[1], server.body_size), 'text/html'
+        elif path == '/favicon.ico':
+            kind, body, content_type = 'other', '', 'image/x-icon'
+        else:
+            server.count('missing')
+            self.send_empty(404)
+            return
+        server.count(kind)
+
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            data = gzip.compress(data)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    do_HEAD = do_GET
+
+
+class FakeNewsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0, feed_items=20, body_size=20000, error_rate=0, seed=None):
+        super().__init__(('127.0.0.1', port), FakeNewsHandler)
+        self.latency = latency
+        self.feed_items = feed_items
+        self.body_size = body_size
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.hits = {}
+
+    def count(self, kind):
+        """Requests served per kind: page, feed, article, other, missing, error."""
+        with self.lock:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+
+    def url(self, path='/'):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+            self.hits = {}
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
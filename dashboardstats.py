@@ -0,0 +1,135 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from models import db, RSSFeed, FeedSource, RSSFeedContent, ReadLog, SourceDayCount, UserCounter, insert_ignore
+
+# Days on the dashboard chart, today included
+CHART_DAYS = 7
+
+
+def subscribed_urls(user_id):
+    return db.select(RSSFeed.url).where(RSSFeed.user_id == user_id)
+
+
+def stored_post_count():
+    return db.select(db.func.count(RSSFeedContent.id))\
+        .where(RSSFeedContent.feed_base_url == FeedSource.url)\
+        .scalar_subquery()
+
+
+def count_unknown_sources(*criteria):
+    """
+    Fill in post_count for the matching sources that were never counted,
+    like those stored before the rollups existed. Returns how many were counted.
+    """
+    return FeedSource.query.filter(FeedSource.post_count.is_(None), *criteria)\
+        .update({'post_count': stored_post_count()}, synchronize_session=False)
+
+
+def count_new_posts(feed_url, count, now=None):
+    """
+    Add `count` posts just stored for `feed_url` to the rollups, in the caller's transaction.
+
+    Bumps the source's row for today in source_day_count, its
+    FeedSource.post_count and the counters of its subscribers. Every
+    update is an increment, so concurrent writers never lose a count.
+    """
+    day = (now or datetime.utcnow()).date()
+    db.session.execute(insert_ignore(SourceDayCount).values(feed_base_url=feed_url, day=day, post_count=0))
+    SourceDayCount.query.filter_by(feed_base_url=feed_url, day=day)\
+        .update({'post_count': SourceDayCount.post_count + count}, synchronize_session=False)
+
+    # A source's first posts also make it one more source with posts for its subscribers
+    if count_unknown_sources(FeedSource.url == feed_url):
+        # Counted just now, these posts included
+        first_posts = db.session.query(FeedSource.post_count).filter_by(url=feed_url).scalar() == count
+    else:
+        first_posts = FeedSource.query.filter_by(url=feed_url, post_count=0)\
+            .update({'post_count': count}, synchronize_session=False)
+        if not first_posts:
+            FeedSource.query.filter_by(url=feed_url)\
+                .update({'post_count': FeedSource.post_count + count}, synchronize_session=False)
+
+    changes = {'post_count': UserCounter.post_count + count}
+    if first_posts:
+        changes['source_count'] = UserCounter.source_count + 1
+    subscribers = db.select(RSSFeed.user_id).where(RSSFeed.url == feed_url)
+    UserCounter.query.filter(UserCounter.user_id.in_(subscribers)).update(changes, synchronize_session=False)
+
+
+def count_read(user_id):
+    """Add one read to the user's counter, in the caller's transaction."""
+    UserCounter.query.filter_by(user_id=user_id)\
+        .update({'read_count': UserCounter.read_count + 1}, synchronize_session=False)
+
+
+def refresh_user_counter(user_id):
+    """Recompute a user's totals from the per-source counts, after a subscription change or on first view."""
+    count_unknown_sources(FeedSource.url.in_(subscribed_urls(user_id)))
+    post_counts = [post_count for (post_count,) in db.session.query(FeedSource.post_count)
+                   .filter(FeedSource.url.in_(subscribed_urls(user_id)))]
+    values = {
+        'source_count': sum(1 for post_count in post_counts if post_count),
+        'post_count': sum(post_counts),
+        'read_count': ReadLog.query.filter_by(user_id=user_id).count(),
+        'updated_at': datetime.utcnow(),
+    }
+    db.session.execute(insert_ignore(UserCounter).values(user_id=user_id, **values))
+    UserCounter.query.filter_by(user_id=user_id).update(values, synchronize_session=False)
+
+
+def forget_source(feed_url):
+    """Drop the daily counts of a source whose posts are being deleted, in the caller's transaction."""
+    SourceDayCount.query.filter_by(feed_base_url=feed_url).delete(synchronize_session=False)
+
+
+def get_user_counter(user_id):
+    """The user's UserCounter row, computed on first use."""
+    counter = db.session.get(UserCounter, user_id)
+    if counter is None:
+        refresh_user_counter(user_id)
+        db.session.commit()
+        counter = db.session.get(UserCounter, user_id)
+    return counter
+
+
+def get_chart_data(user_id, days=CHART_DAYS):
+    """{domain: {'YYYY-MM-DD': posts}} for the user's sources over the last `days` days, every day filled in."""
+    today = datetime.utcnow().date()
+    dates = [(today - timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days - 1, -1, -1)]
+    rows = db.session.query(SourceDayCount.feed_base_url, SourceDayCount.day, SourceDayCount.post_count).filter(
+        SourceDayCount.feed_base_url.in_(subscribed_urls(user_id)),
+        SourceDayCount.day >= today - timedelta(days=days - 1)
+    ).all()
+
+    chart_data = defaultdict(lambda: dict.fromkeys(dates, 0))
+    for source, day, count in rows:
+        domain = urlparse(source).netloc  # Remove https://
+        chart_data[domain][day.strftime('%Y-%m-%d')] += count
+    return chart_data
+
+
+def rebuild_dashboard_counts():
+    """Recompute every rollup from rss_feed_content; user counters are recomputed on their next view."""
+    SourceDayCount.query.delete(synchronize_session=False)
+    day = db.func.date(RSSFeedContent.created_at)
+    db.session.execute(db.insert(SourceDayCount).from_select(
+        ['feed_base_url', 'day', 'post_count'],
+        db.select(RSSFeedContent.feed_base_url, day, db.func.count(RSSFeedContent.id))
+        .where(RSSFeedContent.created_at.is_not(None))
+        .group_by(RSSFeedContent.feed_base_url, day)
+    ))
+
+    FeedSource.query.update({'post_count': stored_post_count()}, synchronize_session=False)
+
+    UserCounter.query.delete(synchronize_session=False)
+    db.session.commit()
+
+
+def ensure_dashboard_counts():
+    """Rebuild the rollups when there are posts but no daily counts yet, as right after an upgrade."""
+    if db.session.query(SourceDayCount.feed_base_url).first() is None \
+            and db.session.query(RSSFeedContent.id).first() is not None:
+        rebuild_dashboard_counts()
+        return True
+    return False
@@ -0,0 +1,206 @@
+import logging
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from feedparser.datetimes import _parse_date as feedparser_parse_date
+
+log = logging.getLogger('instanews.dates')
+
+# Entry fields holding a date, in order of preference
+DATE_FIELDS = ('published', 'updated', 'created')
+
+RFC822_PATTERN = re.compile(
+    r'^(?:[A-Za-z]{3},?\s*)?(\d{1,2})\s+([A-Za-z]{3})[a-z]*\s+(\d{2,4})\s+(\d{1,2}):(\d{2})(?::(\d{2}))?'
+    r'\s*(?:([+-])(\d{2}):?(\d{2})|([A-Za-z]{1,5}))?$')
+ISO8601_PATTERN = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})(?:[Tt ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d+))?)?)?'
+    r'\s*(?:([Zz])|([+-])(\d{2}):?(\d{2}))?$')
+
+MONTHS = {name: number for number, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), 1)}
+
+# Zone names feeds put after the time, as hours east of UTC. Ambiguous
+# abbreviations take their most common meaning in feeds (IST is India, CST
+# and AST are North American). Dates with any other name are rejected.
+ZONE_OFFSETS = {
+    'ut': 0, 'utc': 0, 'gmt': 0, 'z': 0,
+    'est': -5, 'edt': -4, 'cst': -6, 'cdt': -5, 'mst': -7, 'mdt': -6, 'pst': -8, 'pdt': -7,
+    'ast': -4, 'adt': -3, 'nst': -3.5, 'ndt': -2.5, 'akst': -9, 'akdt': -8, 'hst': -10,
+    'wet': 0, 'west': 1, 'bst': 1, 'cet': 1, 'cest': 2, 'met': 1, 'mest': 2, 'mez': 1, 'mesz': 2,
+    'eet': 2, 'eest': 3, 'msk': 3, 'wat': 1, 'cat': 2, 'sast': 2, 'eat': 3,
+    'ist': 5.5, 'pkt': 5, 'wib': 7, 'ict': 7, 'sgt': 8, 'hkt': 8, 'pht': 8, 'awst': 8,
+    'jst': 9, 'kst': 9, 'acst': 9.5, 'aest': 10, 'acdt': 10.5, 'aedt': 11, 'nzst': 12, 'nzdt': 13,
+}
+# A zone name right after the time, e.g. "... 15:04:05 CEST"
+ZONE_NAME_SUFFIX = re.compile(r'\d\s*([A-Za-z]{1,5})$')
+
+# Formats tried when neither fast path applies; each feed remembers the one that last worked.
+# No %Z: strptime reads any zone name it accepts as UTC.
+FALLBACK_FORMATS = (
+    '%a, %d %b %Y %H:%M %z',
+    '%d %b %Y %H:%M:%S %z',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%dT%H:%M:%S.%f%z',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y/%m/%d %H:%M:%S',
+    '%d.%m.%Y %H:%M:%S',
+    '%d.%m.%Y %H:%M',
+    '%B %d, %Y %H:%M:%S',
+    '%B %d, %Y',
+)
+
+# Keeps the memo from growing without bound if feed URLs are never reused
+FORMAT_MEMO_SIZE = 10000
+
+
+def to_utc(value):
+    """Naive UTC datetime, the form post dates are stored in; naive input is taken to be UTC already."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def from_struct(struct):
+    """Naive UTC datetime from one of feedparser's *_parsed structs (which are UTC)."""
+    return datetime(*struct[:6])
+
+
+def zone_name(value):
+    """The zone name ending a date string, lowercased, or None; "am"/"pm" are not zones."""
+    match = ZONE_NAME_SUFFIX.search(value)
+    if match and match.group(1).lower() not in ('am', 'pm'):
+        return match.group(1).lower()
+    return None
+
+
+def parse_rfc822(match):
+    """UTC datetime from an RFC822_PATTERN match; None for zone names it does not know."""
+    day, month, year, hour, minute, second, sign, offset_hours, offset_minutes, zone = match.groups()
+    month = MONTHS.get(month.lower())
+    if not month:
+        return None
+    year = int(year)
+    if year < 100:
+        year += 2000 if year < 50 else 1900
+
+    if sign:
+        offset = timedelta(hours=int(offset_hours), minutes=int(offset_minutes))
+        offset = -offset if sign == '-' else offset
+    elif zone:
+        if zone.lower() not in ZONE_OFFSETS:
+            return None
+        offset = timedelta(hours=ZONE_OFFSETS[zone.lower()])
+    else:
+        offset = timedelta(0)
+
+    return datetime(year, month, int(day), int(hour), int(minute), int(second or 0)) - offset
+
+
+def parse_iso8601(match):
+    """UTC datetime from an ISO8601_PATTERN match; values without an offset are taken as UTC."""
+    year, month, day, hour, minute, second, fraction, zulu, sign, offset_hours, offset_minutes = match.groups()
+    parsed = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                      int(fraction[:6].ljust(6, '0')) if fraction else 0)
+    if sign:
+        offset = timedelta(hours=int(offset_hours), minutes=int(offset_minutes))
+        parsed -= -offset if sign == '-' else offset
+    return parsed
+
+
+class DateParser:
+    """
+    Feed date strings to naive UTC datetimes.
+
+    RFC 822 and ISO 8601 strings, nearly all of what feeds publish, are
+    read straight from the groups of one precompiled regex. Anything else is tried
+    against FALLBACK_FORMATS starting with the format that last succeeded
+    for the same feed, so a feed with an odd format pays for the search
+    once. feedparser's own date handlers are the last resort.
+    """
+
+    def __init__(self, memo_size=FORMAT_MEMO_SIZE):
+        self.memo_size = memo_size
+        self._formats = {}
+        self._lock = threading.Lock()
+
+    def parse(self, value, feed_url=None):
+        """UTC datetime for `value`, or None if it is not a recognizable date."""
+        if isinstance(value, datetime):
+            return to_utc(value)
+        if not value:
+            return None
+        value = value.strip()
+
+        try:
+            match = RFC822_PATTERN.match(value)
+            if match:
+                parsed = parse_rfc822(match)
+                if parsed:
+                    return parsed
+            match = ISO8601_PATTERN.match(value)
+            if match:
+                return parse_iso8601(match)
+        except (ValueError, OverflowError):
+            pass
+
+        zone = zone_name(value)
+        if zone and zone not in ZONE_OFFSETS:
+            # strptime and feedparser would read it as UTC and store the post hours off
+            log.warning("Unknown time zone in date %r%s", value, f" of {feed_url}" if feed_url else "")
+            return None
+        return self._parse_with_formats(value, feed_url)
+
+    def _parse_with_formats(self, value, feed_url):
+        remembered = self._formats.get(feed_url)
+        formats = (remembered,) + FALLBACK_FORMATS if remembered else FALLBACK_FORMATS
+        for date_format in formats:
+            try:
+                parsed = datetime.strptime(value, date_format)
+            except ValueError:
+                continue
+            if feed_url and date_format != remembered:
+                with self._lock:
+                    if len(self._formats) >= self.memo_size:
+                        self._formats.clear()
+                    self._formats[feed_url] = date_format
+            return to_utc(parsed)
+
+        struct = feedparser_parse_date(value)
+        return from_struct(struct) if struct else None
+
+    def entry_date(self, entry, feed_url=None):
+        """
+        Date of a feedparser entry as naive UTC, or None when it has none.
+
+        Prefers the struct feedparser already parsed for published, updated
+        or created, and only parses the raw strings it could not read.
+        feedparser reads most zone names as UTC, so strings ending in one
+        other than UTC/GMT are always parsed here.
+        """
+        for field in DATE_FIELDS:
+            struct = entry.get(f'{field}_parsed')
+            raw = entry.get(field)
+            if raw and zone_name(raw) not in (None, 'ut', 'utc', 'gmt', 'z'):
+                continue
+            if struct:
+                try:
+                    return from_struct(struct)
+                except (TypeError, ValueError, OverflowError):
+                    pass
+
+        for field in DATE_FIELDS:
+            parsed = self.parse(entry.get(field), feed_url)
+            if parsed:
+                return parsed
+        return None
+
+
+date_parser = DateParser()
+
+
+def parse_date(value, feed_url=None):
+    return date_parser.parse(value, feed_url)
+
+
+def entry_date(entry, feed_url=None):
+    return date_parser.entry_date(entry, feed_url)
@@ -0,0 +1,82 @@
+import statistics
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# sy:updatePeriod values in seconds
+UPDATE_PERIODS = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 7 * 86400,
+    'monthly': 30 * 86400,
+    'yearly': 365 * 86400,
+}
+
+
+def feed_hint_interval(parsed_feed):
+    """Shortest polling interval (seconds) the feed allows via <ttl> or sy:updatePeriod, or None."""
+    feed = parsed_feed.feed
+    hints = []
+
+    try:
+        ttl = int(feed.get('ttl') or 0)
+        if ttl > 0:
+            hints.append(ttl * 60)
+    except ValueError:
+        pass
+
+    period = (feed.get('sy_updateperiod') or '').strip().lower()
+    if period in UPDATE_PERIODS:
+        try:
+            frequency = max(1, int(feed.get('sy_updatefrequency') or 1))
+        except ValueError:
+            frequency = 1
+        hints.append(UPDATE_PERIODS[period] // frequency)
+
+    return max(hints) if hints else None
+
+
+def learn_interval(post_dates, now, hint=None, min_interval=120, max_interval=21600, default=300):
+    """
+    Polling interval (seconds) learned from a source's publishing history.
+
+    Takes the median gap between the most recent posts, counting the silence
+    since the newest one, and polls twice per expected post. A feed hint is a
+    lower bound. The result is clamped to [min_interval, max_interval].
+    """
+    dates = sorted((date for date in post_dates if date and date <= now), reverse=True)
+    if len(dates) < 2:
+        interval = default
+    else:
+        gaps = [(newer - older).total_seconds() for newer, older in zip([now] + dates, dates)]
+        gaps = [gap for gap in gaps if gap > 0]
+        interval = statistics.median(gaps) / 2 if gaps else default
+
+    if hint:
+        interval = max(interval, hint)
+
+    return int(min(max(interval, min_interval), max_interval))
+
+
+def failure_interval(interval, failure_count, max_interval=21600, retry_after=None):
+    """Exponential backoff after consecutive failures, never sooner than the server's Retry-After."""
+    backoff = min(interval * 2 ** failure_count, max_interval)
+    if retry_after:
+        backoff = max(backoff, retry_after)
+    return int(backoff)
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = now or datetime.now(timezone.utc)
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0, int((retry_at - now).total_seconds()))
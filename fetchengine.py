@@ -0,0 +1,104 @@
+import logging
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+log = logging.getLogger('instanews.fetch')
+
+
+class FetchJob:
+    """A unit of network work: `func(*args)` run on behalf of `url`."""
+
+    def __init__(self, key, url, func, *args):
+        self.key = key
+        self.url = url
+        self.func = func
+        self.args = args
+
+    @property
+    def host(self):
+        return urlparse(self.url).netloc.lower()
+
+
+class FetchEngine:
+    """
+    Run network-bound jobs on a bounded thread pool.
+
+    At most `max_workers` jobs run at once and at most `per_host_limit` of
+    them target the same host; `per_host_interval` additionally spaces out
+    job starts per host (seconds). Jobs for a busy host wait in a per-host
+    queue instead of occupying a worker. Results are yielded back to the
+    calling thread, which stays the only one touching the database.
+    """
+
+    def __init__(self, max_workers=16, per_host_limit=2, deadline=None, per_host_interval=0):
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.per_host_interval = per_host_interval
+        self.deadline = deadline
+
+    def run(self, jobs):
+        """
+        Yield `(job, result, error)` for every job as soon as it finishes.
+
+        When the deadline (in seconds) expires, jobs that have not started are
+        dropped and running ones are abandoned; they are reported as skipped.
+        """
+        pending = defaultdict(deque)
+        for job in jobs:
+            pending[job.host].append(job)
+
+        active = defaultdict(int)
+        ready_at = defaultdict(float)
+        in_flight = {}
+        started_at = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fetch')
+
+        def dispatch():
+            now = time.monotonic()
+            for host in list(pending):
+                while (pending[host] and active[host] < self.per_host_limit
+                       and len(in_flight) < self.max_workers and ready_at[host] <= now):
+                    job = pending[host].popleft()
+                    in_flight[executor.submit(job.func, *job.args)] = job
+                    active[host] += 1
+                    ready_at[host] = now + self.per_host_interval
+                if not pending[host]:
+                    del pending[host]
+
+        try:
+            dispatch()
+            while in_flight or pending:
+                timeout = None
+                if self.deadline is not None:
+                    timeout = self.deadline - (time.monotonic() - started_at)
+                    if timeout <= 0:
+                        break
+
+                # Wake up for the next host that comes off its interval
+                if len(in_flight) < self.max_workers:
+                    now = time.monotonic()
+                    waits = [ready_at[host] - now for host in pending
+                             if active[host] < self.per_host_limit and ready_at[host] > now]
+                    if waits:
+                        timeout = min(waits) if timeout is None else min(timeout, min(waits))
+
+                if in_flight:
+                    done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(timeout or 0)
+                    done = ()
+
+                for future in done:
+                    job = in_flight.pop(future)
+                    active[job.host] -= 1
+                    error = future.exception()
+                    yield job, (None if error else future.result()), error
+                dispatch()
+
+            skipped = len(in_flight) + sum(len(queue) for queue in pending.values())
+            if skipped:
+                log.warning("Fetch deadline of %ss reached, skipped %d job(s)", self.deadline, skipped)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,160 @@
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+# Longest plain-text snippet stored per post (characters, ellipsis included)
+SNIPPET_LENGTH = 280
+
+# Tags kept in safe HTML, with the attributes each may carry
+ALLOWED_TAGS = {
+    'a': ('href', 'title'),
+    'abbr': ('title',),
+    'b': (), 'strong': (), 'i': (), 'em': (), 'u': (), 's': (), 'sub': (), 'sup': (),
+    'p': (), 'br': (), 'hr': (), 'blockquote': (), 'q': (), 'cite': (), 'code': (), 'pre': (),
+    'ul': (), 'ol': (), 'li': (), 'dl': (), 'dt': (), 'dd': (),
+    'h1': (), 'h2': (), 'h3': (), 'h4': (), 'h5': (), 'h6': (),
+    'figure': (), 'figcaption': (),
+    'img': ('src', 'alt', 'title', 'width', 'height'),
+    'table': (), 'thead': (), 'tbody': (), 'tr': (), 'th': (), 'td': (),
+}
+VOID_TAGS = frozenset(('br', 'hr', 'img'))
+URL_ATTRIBUTES = frozenset(('href', 'src'))
+URL_SCHEMES = frozenset(('http', 'https', 'mailto'))
+
+# Dropped together with everything inside them
+SKIPPED_TAGS = frozenset(('script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template',
+                          'svg', 'math', 'form', 'select', 'textarea', 'head', 'title'))
+
+# Tags that separate words in the plain text
+BLOCK_TAGS = frozenset(('p', 'br', 'hr', 'div', 'li', 'dt', 'dd', 'blockquote', 'pre', 'tr', 'td', 'th',
+                        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'figure', 'figcaption', 'section', 'article'))
+
+
+class PostContentCleaner(HTMLParser):
+    """
+    Sanitize feed HTML and extract its text in a single tokenizer pass.
+
+    Safe HTML is rebuilt from the tokens rather than filtered: only
+    ALLOWED_TAGS with their allowed attributes are written back, every text
+    and attribute value is re-escaped, URLs must be absolute http(s)/mailto
+    after resolving against `base_url`, and the contents of SKIPPED_TAGS
+    are dropped. Entities are decoded once, by the tokenizer.
+    """
+
+    def __init__(self, base_url=None):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.html = []
+        self.text = []
+        self._open = []
+        self._skip_depth = 0
+
+    def _safe_url(self, value):
+        value = (value or '').strip()
+        url = urljoin(self.base_url, value) if self.base_url else value
+        return url if urlparse(url).scheme.lower() in URL_SCHEMES else None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            if tag not in VOID_TAGS:
+                # Tracked but never written, so its end tag still closes what was opened inside it
+                self._open.append(tag)
+            return
+
+        allowed = ALLOWED_TAGS[tag]
+        rendered = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES:
+                value = self._safe_url(value)
+                if value is None:
+                    continue
+            rendered.append(f' {name}="{escape(value, quote=True)}"')
+        if tag == 'img' and not any(attr.startswith(' src=') for attr in rendered):
+            return
+        if tag == 'a':
+            rendered.append(' rel="nofollow noopener" target="_blank"')
+
+        self.html.append(f"<{tag}{''.join(rendered)}>")
+        if tag not in VOID_TAGS:
+            self._open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self._open and self._open[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+            return
+        if self._skip_depth:
+            return
+
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag in self._open:
+            # Close whatever was left open inside it, so the output stays well formed
+            while self._open:
+                open_tag = self._open.pop()
+                self._close(open_tag)
+                if open_tag == tag:
+                    break
+
+    def _close(self, tag):
+        if tag in ALLOWED_TAGS:
+            self.html.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def result(self):
+        self.close()
+        while self._open:
+            self._close(self._open.pop())
+        return ''.join(self.html), ' '.join(''.join(self.text).split())
+
+
+def truncate_text(text, length=SNIPPET_LENGTH):
+    """Cut text to at most `length` characters at a word boundary, marking the cut with an ellipsis."""
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip(' .,;:-') + '…'
+
+
+def clean_post_content(html_content, base_url=None, snippet_length=SNIPPET_LENGTH):
+    """Return (safe_html, snippet) for a post's HTML, from one parse."""
+    if not html_content:
+        return '', ''
+    cleaner = PostContentCleaner(base_url)
+    cleaner.feed(html_content)
+    safe_html, text = cleaner.result()
+    return safe_html, truncate_text(text, snippet_length)
+
+
+def html_to_text(html_content):
+    """Plain text of an HTML fragment: tags dropped, entities decoded, whitespace collapsed."""
+    if not html_content:
+        return ''
+    cleaner = PostContentCleaner()
+    cleaner.feed(html_content)
+    return cleaner.result()[1]
@@ -0,0 +1,207 @@
+from http.cookiejar import DefaultCookiePolicy
+from socket import timeout as SocketTimeout
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util import connection
+from urllib3.util.request import ACCEPT_ENCODING  # adds br when a brotli package is installed
+from urlguard import resolution_cache, UnsafeAddressError
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+# Content types worth parsing as a feed or page; anything else is dropped unread
+TEXTUAL_MARKERS = ('text/', 'xml', 'json', 'html', 'rss', 'atom')
+
+
+class UnacceptableResponse(ValueError):
+    """Raised for a body that is not textual or is larger than the allowed size."""
+
+
+def check_textual(response):
+    """Raise UnacceptableResponse unless the Content-Type is missing or textual."""
+    content_type = response.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+    if content_type and not any(marker in content_type for marker in TEXTUAL_MARKERS):
+        raise UnacceptableResponse(f"Unexpected content type {content_type} for {response.url}")
+
+
+class BoundedBody:
+    """
+    Read a streamed response body in chunks, never more than `max_bytes`.
+
+    The cap applies to the decoded body, so a small compressed response
+    cannot expand past it either. read_until() stops as soon as a marker has
+    been seen; read_rest() continues from there if the caller needs more.
+    iter_chunks() hands the chunks to an incremental parser instead.
+    """
+
+    def __init__(self, response, max_bytes, chunk_size=16384):
+        self.response = response
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._chunks = response.iter_content(chunk_size=chunk_size)
+
+        declared = response.headers.get('Content-Length', '')
+        if declared.isdigit() and int(declared) > max_bytes and 'Content-Encoding' not in response.headers:
+            raise UnacceptableResponse(f"{response.url} is {declared} bytes, limit is {max_bytes}")
+
+    def iter_chunks(self):
+        """Yield body chunks until the body ends; raise UnacceptableResponse past the cap."""
+        for chunk in self._chunks:
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                raise UnacceptableResponse(f"{self.response.url} exceeds {self.max_bytes} bytes")
+            yield chunk
+
+    def _read(self, marker=None):
+        data = bytearray()
+        for chunk in self.iter_chunks():
+            scan_from = max(0, len(data) - len(marker)) if marker else 0
+            data += chunk
+            if marker and data[scan_from:].lower().find(marker) != -1:
+                break
+        return bytes(data)
+
+    def read_until(self, marker):
+        """Read up to the chunk containing `marker` (lowercase bytes, matched case-insensitively)."""
+        return self._read(marker)
+
+    def read_rest(self):
+        return self._read()
+
+
+class PinnedConnectionMixin:
+    """
+    Dial only addresses vetted by urlguard.resolution_cache.
+
+    The host name is still used for the Host header, SNI and certificate
+    checks; only the address the socket connects to is pinned. Applies to
+    every connection, redirect targets included, so a name that re-resolves
+    to a private address after validation is never connected to.
+    """
+
+    def _new_conn(self):
+        try:
+            addresses = resolution_cache.resolve(self._dns_host)
+        except UnsafeAddressError as e:
+            raise NewConnectionError(self, f"Refusing to connect: {e}") from e
+
+        error = None
+        for address in addresses:
+            try:
+                return connection.create_connection(
+                    (address, self.port),
+                    self.timeout,
+                    source_address=self.source_address,
+                    socket_options=self.socket_options,
+                )
+            except SocketTimeout as e:
+                error = ConnectTimeoutError(
+                    self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+                )
+                error.__cause__ = e
+            except OSError as e:
+                error = NewConnectionError(self, f"Failed to establish a new connection: {e}")
+                error.__cause__ = e
+        raise error
+
+
+class PinnedHTTPConnection(PinnedConnectionMixin, HTTPConnection):
+    pass
+
+
+class PinnedHTTPSConnection(PinnedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class PinnedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = PinnedHTTPConnection
+
+
+class PinnedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = PinnedHTTPSConnection
+
+
+class PinnedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools only dial vetted public addresses."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': PinnedHTTPConnectionPool,
+            'https': PinnedHTTPSConnectionPool,
+        }
+
+
+class HttpClient:
+    """
+    One keep-alive connection pool per host, shared by every fetch in the process.
+
+    Consecutive requests to the same host reuse a warm connection instead of
+    opening a new TCP+TLS one. Responses are decompressed transparently
+    (gzip/deflate, brotli when installed). The User-Agent and the
+    (connect, read) timeout are set here once; callers may override both.
+    Cookies are never stored, so fetches do not leak state into each other.
+
+    A pinned client refuses non-public addresses and connects to exactly
+    the addresses it vetted (see PinnedConnectionMixin).
+    """
+
+    def __init__(self, pinned=False, **settings):
+        self.pinned = pinned
+        self.session = requests.Session()
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self.configure(**settings)
+
+    def configure(self, user_agent=DEFAULT_USER_AGENT, connect_timeout=5, read_timeout=10,
+                  pool_connections=100, pool_maxsize=10, max_bytes=5 * 1024 * 1024):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_bytes = max_bytes  # default body cap for BoundedBody readers
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Accept-Encoding': ACCEPT_ENCODING,
+        })
+
+        # pool_connections: hosts kept warm; pool_maxsize: idle connections kept per host
+        adapter_class = PinnedHTTPAdapter if self.pinned else HTTPAdapter
+        adapter = adapter_class(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+http_client = HttpClient()
+# For URLs users control: the SSRF-safe client behind safe_request
+safe_http_client = HttpClient(pinned=True)
+
+
+def configure_http_client(config):
+    """Apply HTTP_* and DNS_CACHE_* settings to the shared clients and the DNS cache."""
+    for client in (http_client, safe_http_client):
+        client.configure(
+            user_agent=config['HTTP_USER_AGENT'],
+            connect_timeout=config['HTTP_CONNECT_TIMEOUT'],
+            read_timeout=config['HTTP_READ_TIMEOUT'],
+            pool_connections=config['HTTP_POOL_CONNECTIONS'],
+            pool_maxsize=config['HTTP_POOL_MAXSIZE'],
+            max_bytes=config['HTTP_MAX_BYTES']
+        )
+    resolution_cache.ttl = config['DNS_CACHE_TTL']
+    resolution_cache.failure_ttl = config['DNS_CACHE_FAILURE_TTL']
+    resolution_cache.maxsize = config['DNS_CACHE_SIZE']
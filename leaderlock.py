@@ -0,0 +1,51 @@
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from models import db, WorkerLock, insert_ignore
+
+log = logging.getLogger('instanews.leaderlock')
+
+
+class LeaderLock:
+    """
+    Database-backed lease: at most one process, on any host, holds `name`.
+
+    The holder renews the lease by calling acquire() again well within `ttl`
+    seconds. If it dies, the lease expires and the next process calling
+    acquire() takes over.
+    """
+
+    def __init__(self, name, ttl=60):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self):
+        """Take the lease if it is free or expired, or renew it if we hold it. Returns True when held."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        try:
+            db.session.execute(insert_ignore(WorkerLock).values(
+                name=self.name, owner=self.owner, expires_at=expires_at
+            ))
+            held = WorkerLock.query.filter(
+                WorkerLock.name == self.name,
+                db.or_(WorkerLock.owner == self.owner, WorkerLock.expires_at < now)
+            ).update({'owner': self.owner, 'expires_at': expires_at}, synchronize_session=False)
+            db.session.commit()
+            return held == 1
+        except Exception as e:
+            log.error("Error acquiring lock %s: %s", self.name, e)
+            db.session.rollback()
+            return False
+
+    def release(self):
+        """Give the lease up so another process can take over right away."""
+        try:
+            WorkerLock.query.filter_by(name=self.name, owner=self.owner).delete()
+            db.session.commit()
+        except Exception as e:
+            log.error("Error releasing lock %s: %s", self.name, e)
+            db.session.rollback()
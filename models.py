@@ -1,9 +1,41 @@
+import hashlib
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.dialects import mysql, sqlite, postgresql
 
 db = SQLAlchemy()
 
+
+# RSSFeedContent.image_status values
+IMAGE_PENDING = 'pending'   # waiting for the enrichment job to fetch the article page
+IMAGE_DONE = 'done'
+IMAGE_MISSING = 'missing'   # article page fetched, no image on it
+IMAGE_FAILED = 'failed'     # gave up after IMAGE_MAX_ATTEMPTS
+
+# AddFeedJob.status values
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+def post_url_hash(post_url):
+    """Fixed-width key for post URLs, which are too long to index directly."""
+    return hashlib.sha1((post_url or '').encode('utf-8')).hexdigest()
+
+
+def insert_ignore(model):
+    """Multi-row INSERT that silently skips rows hitting a unique key."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        return mysql.insert(model).prefix_with('IGNORE')
+    if dialect == 'sqlite':
+        return sqlite.insert(model).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        return postgresql.insert(model).on_conflict_do_nothing()
+    raise NotImplementedError(f"insert_ignore is not supported on {dialect}")
+
 # User Model
 class User(UserMixin, db.Model):
     __tablename__ = 'user'
@@ -30,10 +62,10 @@ class RSSFeed(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     favicon_url = db.Column(db.String(255), nullable=True)
 
-    # Add cascade deletion for related content
+    # Posts belong to the shared source, so a subscription never deletes them
     posts = db.relationship('RSSFeedContent', 
                           backref='feed',
-                          cascade='all, delete-orphan',
+                          viewonly=True,
                           foreign_keys='RSSFeedContent.feed_base_url',
                           primaryjoin='RSSFeed.url == RSSFeedContent.feed_base_url')
 
@@ -43,17 +75,54 @@ class RSSFeed(db.Model):
         return f"<RSSFeed(id={self.id}, url={self.url}, favicon_url={self.favicon_url})>"
 
 
+# FeedSource Model
+class FeedSource(db.Model):
+    """One row per distinct feed URL, shared by every RSSFeed subscribed to it."""
+    __tablename__ = 'feed_source'
+
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(255), unique=True, nullable=False)
+
+    # Conditional GET validators from the last successful fetch
+    etag = db.Column(db.String(255), nullable=True)
+    last_modified = db.Column(db.String(64), nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True)  # sha256 of the body, for servers without validators
+    last_fetched_at = db.Column(db.DateTime, nullable=True)
+
+    # Adaptive polling state
+    fetch_interval = db.Column(db.Integer, nullable=True)  # seconds, learned from the publishing cadence
+    failure_count = db.Column(db.Integer, nullable=False, default=0)
+    next_fetch_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    post_count = db.Column(db.Integer, nullable=True)  # stored posts, kept by ingest (dashboardstats.py); NULL until counted
+
+    def __repr__(self):
+        return f"<FeedSource(id={self.id}, url={self.url})>"
+
+
 # RSSFeedContent Model
 class RSSFeedContent(db.Model):
     __tablename__ = 'rss_feed_content'
+    __table_args__ = (
+        db.UniqueConstraint('feed_base_url', 'post_url_hash', name='uq_feed_post_url'),
+        db.Index('ix_image_queue', 'image_status', 'image_next_attempt_at'),
+        db.Index('ix_feed_post_date', 'feed_base_url', 'post_date', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    feed_base_url = db.Column(db.String(255), db.ForeignKey('rss_feed.url', ondelete='CASCADE'), nullable=False)
+    # The feed_source.url the post was ingested from; no foreign key, posts outlive any one subscription
+    feed_base_url = db.Column(db.String(255), nullable=False)
     post_title = db.Column(db.String(255), nullable=False)
     post_date = db.Column(db.DateTime, nullable=True)
-    post_content = db.Column(db.Text, nullable=True)
+    post_content = db.Column(db.Text, nullable=True)  # sanitized HTML (htmltext.clean_post_content)
+    post_snippet = db.Column(db.String(300), nullable=True)  # bounded plain text served by the timeline
     post_featured_image_url = db.Column(db.String(255), nullable=True)
+    image_status = db.Column(db.String(10), nullable=False, default=IMAGE_DONE)
+    image_attempts = db.Column(db.Integer, nullable=False, default=0)
+    image_next_attempt_at = db.Column(db.DateTime, nullable=True)
     post_url = db.Column(db.String(255), nullable=False)
+    post_url_hash = db.Column(db.String(40), nullable=True,
+                              default=lambda context: post_url_hash(context.get_current_parameters().get('post_url')))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -61,6 +130,46 @@ class RSSFeedContent(db.Model):
         return f"<RSSFeedContent(id={self.id}, title={self.post_title})>"
 
 
+# UserFeedState Model
+class UserFeedState(db.Model):
+    """Per-user ingest watermark, so polling for new posts is a primary key lookup."""
+    __tablename__ = 'user_feed_state'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    latest_ingested_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    def __repr__(self):
+        return f"<UserFeedState(user_id={self.user_id}, latest_ingested_at={self.latest_ingested_at})>"
+
+
+# SourceDayCount Model
+class SourceDayCount(db.Model):
+    """Posts a source gained per (UTC) day, incremented by ingest for the dashboard chart."""
+    __tablename__ = 'source_day_count'
+
+    feed_base_url = db.Column(db.String(255), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SourceDayCount(feed_base_url={self.feed_base_url}, day={self.day}, post_count={self.post_count})>"
+
+
+# UserCounter Model
+class UserCounter(db.Model):
+    """Dashboard totals of one user, computed on first view and then kept up to date by ingest and reads."""
+    __tablename__ = 'user_counter'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    source_count = db.Column(db.Integer, nullable=False, default=0)  # subscribed sources with posts
+    post_count = db.Column(db.Integer, nullable=False, default=0)  # posts of the subscribed sources
+    read_count = db.Column(db.Integer, nullable=False, default=0)  # rss_read_log rows
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UserCounter(user_id={self.user_id}, post_count={self.post_count}, read_count={self.read_count})>"
+
+
 # ReadLog Model
 class ReadLog(db.Model):
     __tablename__ = 'rss_read_log'
@@ -73,4 +182,54 @@ class ReadLog(db.Model):
     user = db.relationship('User', backref='rss_read_logs', lazy=True)
 
     def __repr__(self):
-        return f"<ReadLog user_id={self.user_id}, rss_feed_content_url={self.rss_feed_content_url}, read_at={self.read_at}>"
\ No newline at end of file
+        return f"<ReadLog user_id={self.user_id}, rss_feed_content_url={self.rss_feed_content_url}, read_at={self.read_at}>"
+
+
+# WorkerLock Model
+class WorkerLock(db.Model):
+    """Lease held by the one process allowed to run a background loop (see leaderlock.py)."""
+    __tablename__ = 'worker_lock'
+
+    name = db.Column(db.String(64), primary_key=True)
+    owner = db.Column(db.String(128), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<WorkerLock(name={self.name}, owner={self.owner}, expires_at={self.expires_at})>"
+
+
+# MigrationProgress Model
+class MigrationProgress(db.Model):
+    """One processed item of a maintenance command, so an interrupted run resumes where it stopped."""
+    __tablename__ = 'migration_progress'
+
+    migration = db.Column(db.String(64), primary_key=True)
+    item = db.Column(db.String(255), primary_key=True)
+    status = db.Column(db.String(10), nullable=False)
+    result = db.Column(db.String(255), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<MigrationProgress(migration={self.migration}, item={self.item}, status={self.status})>"
+
+
+# AddFeedJob Model
+class AddFeedJob(db.Model):
+    """A feed a user asked to add, processed by the ingest worker outside the request."""
+    __tablename__ = 'add_feed_job'
+    __table_args__ = (
+        db.Index('ix_add_feed_job_status', 'status', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    url = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default=JOB_QUEUED)
+    error = db.Column(db.String(255), nullable=True)
+    feed_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AddFeedJob(id={self.id}, url={self.url}, status={self.status})>"
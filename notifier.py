@@ -0,0 +1,116 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+log = logging.getLogger('instanews.notifier')
+
+
+class Broker:
+    """
+    In-process pub/sub of per-user events.
+
+    Every open Server-Sent Events stream subscribes a small queue for its user;
+    ingest publishes to the users following a source once its new posts are
+    committed. A subscriber that stops reading only loses events, it never
+    blocks the publisher.
+    """
+
+    def __init__(self, queue_size=16):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        events = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(events)
+        return events
+
+    def unsubscribe(self, user_id, events):
+        with self._lock:
+            self._subscribers[user_id].discard(events)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+    def publish(self, user_ids, event):
+        with self._lock:
+            targets = [events for user_id in user_ids for events in self._subscribers.get(user_id, ())]
+        for events in targets:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                pass
+
+
+class WatermarkWatcher:
+    """
+    A thread per web process that turns moved ingest watermarks into events.
+
+    Ingest runs in the ingest-worker process and records, per user, when it
+    last stored posts for them (user_feed_state). Instead of every open
+    stream polling its own row, this thread asks `poll(since)` for the rows
+    that moved every `interval` seconds and hands {user_id: watermark} to
+    `on_advance`. Rows are polled again for `overlap` seconds, so a
+    transaction committing a slightly older watermark late is not missed.
+
+    The thread only runs while `active()` is true (streams are open): start()
+    it after subscribing, and it exits on its own once the last one leaves.
+    """
+
+    def __init__(self, poll, on_advance, active, interval=0.5, overlap=5):
+        self.poll = poll
+        self.on_advance = on_advance
+        self.active = active
+        self.interval = interval
+        self.overlap = timedelta(seconds=overlap)
+        self._since = None
+        self._seen = {}
+        self._running = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the thread unless it is already running; call after every subscribe."""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            # Nobody was listening while stopped, so nothing before now needs an event
+            self._since = datetime.utcnow()
+            self._seen = {}
+        threading.Thread(target=self._run, name='watermark-watcher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                # Checked under the lock, so a start() racing this exit starts a new thread
+                if not self.active():
+                    self._running = False
+                    return
+            try:
+                self.check()
+            except Exception as e:
+                log.warning("Error polling ingest watermarks: %s", e)
+            time.sleep(self.interval)
+
+    def check(self):
+        moved = {}
+        for user_id, watermark in self.poll(self._since - self.overlap):
+            if self._seen.get(user_id) != watermark:
+                self._seen[user_id] = watermark
+                moved[user_id] = watermark
+            if watermark > self._since:
+                self._since = watermark
+
+        horizon = self._since - self.overlap
+        for user_id in [user_id for user_id, watermark in self._seen.items() if watermark <= horizon]:
+            del self._seen[user_id]
+
+        if moved:
+            self.on_advance(moved)
@@ -0,0 +1,163 @@
+import codecs
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+# Meta tags naming a page's featured image, in order of preference
+META_IMAGE_KEYS = ('og:image', 'twitter:image', 'article:image')
+
+# How far a scan goes
+HEAD = 'head'      # stop at the end of <head>
+IMAGE = 'image'    # stop at the end of <head> if it names an image, else at the first article image
+FIRST_IMG = 'img'  # stop at the first <img src>
+FULL = 'full'      # read everything (feed links in <a> tags can be anywhere)
+
+
+class StopScan(Exception):
+    pass
+
+
+class PageMetaParser(HTMLParser):
+    """
+    Collect a page's metadata in one incremental pass, without building a tree.
+
+    Gathers meta images (og:image, twitter:image, article:image), icon links,
+    alternate feed links, anchors that look like feeds and the first <img>.
+    Chunks can be fed as they arrive; `done` turns True once the scan has
+    seen what its `mode` asks for, and the caller can stop reading.
+    """
+
+    def __init__(self, mode=FULL, base_url=None):
+        super().__init__(convert_charrefs=True)
+        self.mode = mode
+        self.base_url = base_url
+        self.done = False
+        self.meta_images = {}
+        self.icon_links = []
+        self.feed_links = []
+        self.anchor_feed_links = []
+        self.first_image = None
+        self.article_image = None
+        self._article_depth = 0
+
+    def _url(self, value):
+        value = (value or '').strip()
+        if not value:
+            return None
+        return urljoin(self.base_url, value) if self.base_url else value
+
+    def _stop(self):
+        self.done = True
+        raise StopScan()
+
+    def feed(self, data):
+        if self.done:
+            return
+        try:
+            super().feed(data)
+        except StopScan:
+            pass
+
+    def close(self):
+        if self.done:
+            return
+        try:
+            super().close()
+        except StopScan:
+            pass
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+
+        if tag == 'meta':
+            key = (attrs.get('property') or attrs.get('name') or '').strip().lower()
+            if key in META_IMAGE_KEYS and key not in self.meta_images and attrs.get('content'):
+                self.meta_images[key] = attrs['content'].strip()
+
+        elif tag == 'link':
+            rel = (attrs.get('rel') or '').lower().split()
+            link_type = (attrs.get('type') or '').lower()
+            href = self._url(attrs.get('href'))
+            if not href:
+                return
+            if 'icon' in rel:
+                self.icon_links.append(href)
+            if link_type and ('rss' in link_type or 'atom' in link_type or 'xml' in link_type):
+                self.feed_links.append(href)
+
+        elif tag == 'body' and self.mode == HEAD:
+            self._stop()
+
+        elif tag == 'body' and self.mode == IMAGE and self.meta_images:
+            self._stop()
+
+        elif tag in ('article', 'main'):
+            self._article_depth += 1
+
+        elif tag == 'a' and self.mode == FULL:
+            href = attrs.get('href') or ''
+            if 'rss' in href.lower() or 'feed' in href.lower() or 'atom' in href.lower():
+                self.anchor_feed_links.append(self._url(href))
+
+        elif tag == 'img':
+            src = self._url(attrs.get('src'))
+            if not src:
+                return
+            if self.first_image is None:
+                self.first_image = src
+                if self.mode == FIRST_IMG:
+                    self._stop()
+            if self._article_depth and self.article_image is None:
+                self.article_image = src
+                if self.mode == IMAGE:
+                    self._stop()
+
+    handle_startendtag = handle_starttag
+
+    def handle_endtag(self, tag):
+        if tag == 'head' and (self.mode == HEAD or (self.mode == IMAGE and self.meta_images)):
+            self._stop()
+        elif tag in ('article', 'main') and self._article_depth:
+            self._article_depth -= 1
+
+    @property
+    def meta_image(self):
+        """Featured image named by the page's meta tags, by META_IMAGE_KEYS preference."""
+        for key in META_IMAGE_KEYS:
+            if key in self.meta_images:
+                return self.meta_images[key]
+        return None
+
+    @property
+    def image(self):
+        """Meta image, else the first image inside <article>/<main>, else the first image."""
+        return self.meta_image or self.article_image or self.first_image
+
+
+def scan_html(html, mode=FULL, base_url=None):
+    """Scan an HTML string in one pass; returns the PageMetaParser."""
+    parser = PageMetaParser(mode, base_url)
+    parser.feed(html or '')
+    parser.close()
+    return parser
+
+
+def scan_chunks(chunks, mode=FULL, base_url=None, encoding=None):
+    """Scan an iterable of byte chunks, pulling no more chunks once the scan is done."""
+    parser = PageMetaParser(mode, base_url)
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+        if parser.done:
+            break
+    else:
+        parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    return parser
+
+
+def first_image(html):
+    """src of the first <img> in an HTML fragment, or None."""
+    return scan_html(html, FIRST_IMG).first_image
@@ -0,0 +1,166 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import event
+
+import metrics
+
+log = logging.getLogger('instanews.profiler')
+
+# Statements shown per request in logs and dumps
+TOP_STATEMENTS = 5
+# Functions listed in a profile dump, by cumulative time
+PROFILE_LINES = 40
+
+WHITESPACE = re.compile(r'\s+')
+
+
+class RequestStats:
+    """Queries, database time and (optionally) a cProfile run of one sampled request."""
+
+    def __init__(self, profile):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+        self.query_started = None
+        self.profiler = None
+        if profile:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another profiler is already active in this thread
+                self.profiler = None
+
+    def stop_profiler(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def repeated(self, threshold):
+        """Statements run at least `threshold` times: the signature of an N+1 loop."""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request query accounting, hooked into SQLAlchemy engine events.
+
+    A REQUEST_PROFILE_SAMPLE_RATE share of requests is tracked: their
+    statements are counted and timed, repeated statements are flagged as
+    likely N+1 patterns, the response gets a Server-Timing header and the
+    totals go to /metrics. With REQUEST_PROFILE_DIR set, tracked requests
+    also run under cProfile and the ones slower than REQUEST_PROFILE_SLOW_MS
+    are dumped there. Untracked requests cost one random() call, and queries
+    outside a tracked request one thread-local lookup.
+    """
+
+    def __init__(self, app, engine):
+        self.sample_rate = app.config['REQUEST_PROFILE_SAMPLE_RATE']
+        self.slow_seconds = app.config['REQUEST_PROFILE_SLOW_MS'] / 1000
+        self.n_plus_one = app.config['REQUEST_PROFILE_N_PLUS_ONE']
+        self.profile_dir = app.config['REQUEST_PROFILE_DIR']
+        self._current = threading.local()
+
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._discard)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = getattr(self._current, 'stats', None)
+        if stats is not None:
+            stats.query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = getattr(self._current, 'stats', None)
+        if stats is None or stats.query_started is None:
+            return
+        stats.db_seconds += time.perf_counter() - stats.query_started
+        stats.query_started = None
+        stats.queries += 1
+        # Parameters are bound, so the text is the same for every row an N+1 loop loads
+        stats.statements[statement] += 1
+
+    def _start(self):
+        if random.random() < self.sample_rate:
+            self._current.stats = RequestStats(profile=bool(self.profile_dir))
+
+    def _finish(self, response):
+        stats = getattr(self._current, 'stats', None)
+        if stats is None:
+            return response
+        self._current.stats = None
+        stats.stop_profiler()
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or 'unknown'
+
+        response.headers.add('Server-Timing', f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"')
+        response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.1f}')
+
+        metrics.registry.observe('instanews_request_seconds', elapsed, endpoint=endpoint)
+        metrics.registry.observe('instanews_request_db_seconds', stats.db_seconds, endpoint=endpoint)
+        metrics.inc('instanews_request_queries_total', stats.queries, endpoint=endpoint)
+
+        repeated = stats.repeated(self.n_plus_one)
+        if repeated:
+            metrics.inc('instanews_n_plus_one_total', endpoint=endpoint)
+            statement, count = repeated[0]
+            log.warning("Possible N+1 in %s: %d runs of %s", endpoint, count, shorten(statement))
+
+        if elapsed >= self.slow_seconds:
+            log.warning("Slow request %s %s: %.0f ms, %d queries, %.0f ms in the database",
+                        request.method, request.path, elapsed * 1000, stats.queries, stats.db_seconds * 1000)
+            if stats.profiler is not None:
+                self.dump(stats, endpoint, elapsed)
+        return response
+
+    def _discard(self, exc=None):
+        # Requests that raised never reach after_request
+        stats = getattr(self._current, 'stats', None)
+        if stats is not None:
+            stats.stop_profiler()
+            self._current.stats = None
+
+    def dump(self, stats, endpoint, elapsed):
+        """Write the query summary and the cProfile listing of a slow request to REQUEST_PROFILE_DIR."""
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{endpoint}-{elapsed * 1000:.0f}ms-{os.getpid()}.txt"
+        path = os.path.join(self.profile_dir, name)
+        listing = io.StringIO()
+        pstats.Stats(stats.profiler, stream=listing).sort_stats('cumulative').print_stats(PROFILE_LINES)
+        try:
+            with open(path, 'w', encoding='utf-8') as dump:
+                dump.write(f"{request.method} {request.full_path}\n")
+                dump.write(f"{elapsed * 1000:.1f} ms, {stats.queries} queries, "
+                           f"{stats.db_seconds * 1000:.1f} ms in the database\n\n")
+                for statement, count in stats.statements.most_common(TOP_STATEMENTS):
+                    dump.write(f"{count:>5}x {shorten(statement, 500)}\n")
+                dump.write("\n" + listing.getvalue())
+            log.info("Profile of %s written to %s", endpoint, path)
+        except OSError as e:
+            log.error("Error writing profile %s: %s", path, e)
+
+
+def shorten(statement, length=200):
+    statement = WHITESPACE.sub(' ', statement).strip()
+    return statement if len(statement) <= length else statement[:length - 3] + '...'
+
+
+def init_request_profiler(app, engine):
+    """Install the profiler when REQUEST_PROFILE_SAMPLE_RATE is above zero; returns it or None."""
+    if app.config['REQUEST_PROFILE_SAMPLE_RATE'] <= 0:
+        return None
+    return RequestProfiler(app, engine)
@@ -23,6 +23,23 @@ SET time_zone = "+00:00";
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `add_feed_job`
+--
+
+CREATE TABLE `add_feed_job` (
+  `id` int(11) NOT NULL,
+  `user_id` int(11) NOT NULL,
+  `url` varchar(255) NOT NULL,
+  `status` varchar(10) NOT NULL,
+  `error` varchar(255) DEFAULT NULL,
+  `feed_id` int(11) DEFAULT NULL,
+  `created_at` datetime DEFAULT NULL,
+  `updated_at` datetime DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `alembic_version`
 --
@@ -40,6 +57,54 @@ INSERT INTO `alembic_version` (`version_num`) VALUES
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `feed_source`
+--
+
+CREATE TABLE `feed_source` (
+  `id` int(11) NOT NULL,
+  `url` varchar(255) NOT NULL,
+  `etag` varchar(255) DEFAULT NULL,
+  `last_modified` varchar(64) DEFAULT NULL,
+  `content_hash` varchar(64) DEFAULT NULL,
+  `last_fetched_at` datetime DEFAULT NULL,
+  `fetch_interval` int(11) DEFAULT NULL,
+  `failure_count` int(11) NOT NULL DEFAULT 0,
+  `next_fetch_at` datetime DEFAULT NULL,
+  `post_count` int(11) DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+--
+-- Dumping data for table `feed_source`
+--
+
+INSERT INTO `feed_source` (`id`, `url`, `post_count`) VALUES
+(1, 'https://friss.ro', 42),
+(2, 'https://presasm.ro', 50),
+(3, 'https://www.digi24.ro', 274),
+(4, 'https://primariasm.ro', 25),
+(5, 'https://portalsm.ro', 55),
+(6, 'https://www.mcid.gov.ro', 10),
+(7, 'https://dincolodesport.eu', 99),
+(8, 'https://www.szatmar.ro', 54);
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `migration_progress`
+--
+
+CREATE TABLE `migration_progress` (
+  `migration` varchar(64) NOT NULL,
+  `item` varchar(255) NOT NULL,
+  `status` varchar(10) NOT NULL,
+  `result` varchar(255) DEFAULT NULL,
+  `attempts` int(11) NOT NULL DEFAULT 0,
+  `updated_at` datetime DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `rss_feed`
 --
@@ -78,10 +143,15 @@ CREATE TABLE `rss_feed_content` (
   `post_title` varchar(512) DEFAULT NULL,
   `post_date` datetime DEFAULT NULL,
   `post_content` text DEFAULT NULL,
+  `post_snippet` varchar(300) DEFAULT NULL,
   `post_featured_image_url` varchar(500) DEFAULT NULL,
+  `image_status` varchar(10) NOT NULL DEFAULT 'done',
+  `image_attempts` int(11) NOT NULL DEFAULT 0,
+  `image_next_attempt_at` datetime DEFAULT NULL,
   `created_at` timestamp NULL DEFAULT current_timestamp(),
   `updated_at` timestamp NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
-  `post_url` varchar(500) DEFAULT NULL
+  `post_url` varchar(500) DEFAULT NULL,
+  `post_url_hash` char(40) DEFAULT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 --
@@ -772,6 +842,51 @@ INSERT INTO `rss_read_log` (`id`, `user_id`, `rss_feed_content_url`, `clicked_at
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `source_day_count`
+--
+
+CREATE TABLE `source_day_count` (
+  `feed_base_url` varchar(255) NOT NULL,
+  `day` date NOT NULL,
+  `post_count` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+--
+-- Dumping data for table `source_day_count`
+--
+
+INSERT INTO `source_day_count` (`feed_base_url`, `day`, `post_count`) VALUES
+('https://dincolodesport.eu', '2025-01-27', 10),
+('https://dincolodesport.eu', '2025-01-28', 50),
+('https://dincolodesport.eu', '2025-01-29', 32),
+('https://dincolodesport.eu', '2025-01-30', 7),
+('https://friss.ro', '2025-01-27', 20),
+('https://friss.ro', '2025-01-28', 14),
+('https://friss.ro', '2025-01-29', 6),
+('https://friss.ro', '2025-01-30', 2),
+('https://portalsm.ro', '2025-01-27', 21),
+('https://portalsm.ro', '2025-01-28', 17),
+('https://portalsm.ro', '2025-01-29', 16),
+('https://portalsm.ro', '2025-01-30', 1),
+('https://presasm.ro', '2025-01-27', 11),
+('https://presasm.ro', '2025-01-28', 20),
+('https://presasm.ro', '2025-01-29', 15),
+('https://presasm.ro', '2025-01-30', 4),
+('https://primariasm.ro', '2025-01-27', 20),
+('https://primariasm.ro', '2025-01-28', 4),
+('https://primariasm.ro', '2025-01-29', 1),
+('https://www.digi24.ro', '2025-01-27', 21),
+('https://www.digi24.ro', '2025-01-28', 124),
+('https://www.digi24.ro', '2025-01-29', 86),
+('https://www.digi24.ro', '2025-01-30', 43),
+('https://www.mcid.gov.ro', '2025-01-27', 10),
+('https://www.szatmar.ro', '2025-01-28', 20),
+('https://www.szatmar.ro', '2025-01-29', 24),
+('https://www.szatmar.ro', '2025-01-30', 10);
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `user`
 --
@@ -793,16 +908,75 @@ INSERT INTO `user` (`id`, `username`, `email`, `password`, `is_active`) VALUES
 (2, 'test', 'test@test.com', 'scrypt:32768:8:1$8sSgXeR8FCupwh1K$c3c1ca352d0270a70c708aba62c7e0ced8e24f7d56b036629da8284874b8381c331ae54d7106426d8ac0f5c96687ae2d57aeba8b30bf253e60ba4c67827c1660', 1),
 (3, 'test10', 'test10@test.com', 'scrypt:32768:8:1$ccGD4iaLzk5pcO4H$74b58cb47c34285beecbe514d412521b5a52e757a975b529ce457a6b5a8b8e95318821ac36bc12cf188f0bf51fad5886f57d1846ce2bfee50c83d1a2241627dd', 0);
 
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `user_counter`
+--
+
+CREATE TABLE `user_counter` (
+  `user_id` int(11) NOT NULL,
+  `source_count` int(11) NOT NULL DEFAULT 0,
+  `post_count` int(11) NOT NULL DEFAULT 0,
+  `read_count` int(11) NOT NULL DEFAULT 0,
+  `updated_at` datetime DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `user_feed_state`
+--
+
+CREATE TABLE `user_feed_state` (
+  `user_id` int(11) NOT NULL,
+  `latest_ingested_at` datetime DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `worker_lock`
+--
+
+CREATE TABLE `worker_lock` (
+  `name` varchar(64) NOT NULL,
+  `owner` varchar(128) NOT NULL,
+  `expires_at` datetime NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 --
 -- Indexes for dumped tables
 --
 
+--
+-- Indexes for table `add_feed_job`
+--
+ALTER TABLE `add_feed_job`
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `ix_add_feed_job_user_id` (`user_id`),
+  ADD KEY `ix_add_feed_job_status` (`status`,`id`);
+
 --
 -- Indexes for table `alembic_version`
 --
 ALTER TABLE `alembic_version`
   ADD PRIMARY KEY (`version_num`);
 
+--
+-- Indexes for table `feed_source`
+--
+ALTER TABLE `feed_source`
+  ADD PRIMARY KEY (`id`),
+  ADD UNIQUE KEY `url` (`url`),
+  ADD KEY `ix_feed_source_next_fetch_at` (`next_fetch_at`);
+
+--
+-- Indexes for table `migration_progress`
+--
+ALTER TABLE `migration_progress`
+  ADD PRIMARY KEY (`migration`,`item`);
+
 --
 -- Indexes for table `rss_feed`
 --
@@ -817,6 +991,19 @@ ALTER TABLE `rss_feed`
 ALTER TABLE `rss_feed_content`
   ADD PRIMARY KEY (`id`);
 
+UPDATE `rss_feed_content` SET `post_url_hash` = SHA1(`post_url`);
+
+DELETE `duplicate` FROM `rss_feed_content` `duplicate`
+  JOIN `rss_feed_content` `original`
+    ON `original`.`feed_base_url` = `duplicate`.`feed_base_url`
+   AND `original`.`post_url_hash` = `duplicate`.`post_url_hash`
+   AND `original`.`id` < `duplicate`.`id`;
+
+ALTER TABLE `rss_feed_content`
+  ADD UNIQUE KEY `uq_feed_post_url` (`feed_base_url`,`post_url_hash`),
+  ADD KEY `ix_image_queue` (`image_status`,`image_next_attempt_at`),
+  ADD KEY `ix_feed_post_date` (`feed_base_url`,`post_date`,`id`);
+
 --
 -- Indexes for table `rss_read_log`
 --
@@ -825,6 +1012,12 @@ ALTER TABLE `rss_read_log`
   ADD KEY `user_id` (`user_id`),
   ADD KEY `rss_feed_content_id` (`rss_feed_content_url`);
 
+--
+-- Indexes for table `source_day_count`
+--
+ALTER TABLE `source_day_count`
+  ADD PRIMARY KEY (`feed_base_url`,`day`);
+
 --
 -- Indexes for table `user`
 --
@@ -833,10 +1026,41 @@ ALTER TABLE `user`
   ADD UNIQUE KEY `email` (`email`),
   ADD UNIQUE KEY `username` (`username`);
 
+--
+-- Indexes for table `user_counter`
+--
+ALTER TABLE `user_counter`
+  ADD PRIMARY KEY (`user_id`);
+
+--
+-- Indexes for table `user_feed_state`
+--
+ALTER TABLE `user_feed_state`
+  ADD PRIMARY KEY (`user_id`),
+  ADD KEY `ix_user_feed_state_latest_ingested_at` (`latest_ingested_at`);
+
+--
+-- Indexes for table `worker_lock`
+--
+ALTER TABLE `worker_lock`
+  ADD PRIMARY KEY (`name`);
+
 --
 -- AUTO_INCREMENT for dumped tables
 --
 
+--
+-- AUTO_INCREMENT for table `add_feed_job`
+--
+ALTER TABLE `add_feed_job`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+
+--
+-- AUTO_INCREMENT for table `feed_source`
+--
+ALTER TABLE `feed_source`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=9;
+
 --
 -- AUTO_INCREMENT for table `rss_feed`
 --
@@ -865,6 +1089,12 @@ ALTER TABLE `user`
 -- Constraints for dumped tables
 --
 
+--
+-- Constraints for table `add_feed_job`
+--
+ALTER TABLE `add_feed_job`
+  ADD CONSTRAINT `add_feed_job_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `user` (`id`) ON DELETE CASCADE;
+
 --
 -- Constraints for table `rss_feed`
 --
@@ -876,6 +1106,18 @@ ALTER TABLE `rss_feed`
 --
 ALTER TABLE `rss_read_log`
   ADD CONSTRAINT `rss_read_log_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `user` (`id`) ON DELETE CASCADE;
+
+--
+-- Constraints for table `user_counter`
+--
+ALTER TABLE `user_counter`
+  ADD CONSTRAINT `user_counter_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `user` (`id`) ON DELETE CASCADE;
+
+--
+-- Constraints for table `user_feed_state`
+--
+ALTER TABLE `user_feed_state`
+  ADD CONSTRAINT `user_feed_state_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `user` (`id`) ON DELETE CASCADE;
 COMMIT;
 
 /*!40101 SET CHARACTER_SET_CLIENT=@OLD_CHARACTER_SET_CLIENT */;
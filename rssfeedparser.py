@@ -2,45 +2,28 @@ from feedparser import parse
 from datetime import datetime
 from models import RSSFeedContent, db
 import requests
-from bs4 import BeautifulSoup
-from dateutil import parser
-from pytz import timezone
 import feedparser
 from urllib.parse import urlparse
 import warnings
+import logging
 from flask import current_app
-from models import db, RSSFeed, RSSFeedContent
+from models import db, RSSFeed, RSSFeedContent, MigrationProgress
+from fetchengine import FetchEngine, FetchJob
+from timelinecache import LRUBackend
+from httpclient import http_client, safe_http_client, BoundedBody, check_textual
+from pagemeta import scan_html, HEAD, FULL
+from htmltext import clean_post_content, html_to_text
+from feeddates import entry_date, parse_date
+import metrics
 
 warnings.filterwarnings('ignore')
 
+log = logging.getLogger('instanews.discovery')
+
 
 def adjust_datetime_with_timezone(date_string):
-    """Convert various datetime strings to proper datetime objects."""
-    try:
-        if isinstance(date_string, datetime):
-            return date_string
-        
-        # Try different date formats
-        for date_format in [
-            '%a, %d %b %Y %H:%M:%S %z',
-            '%a, %d %b %Y %H:%M:%S %Z',
-            '%Y-%m-%dT%H:%M:%S%z',
-            '%Y-%m-%dT%H:%M:%SZ',
-            '%Y-%m-%d %H:%M:%S',
-        ]:
-            try:
-                return datetime.strptime(date_string, date_format)
-            except ValueError:
-                continue
-        
-        # If all formats fail, use feedparser's date parser
-        parsed_date = feedparser._parse_date(date_string)
-        if parsed_date:
-            return datetime(*parsed_date[:6])
-            
-        return datetime.now()
-    except:
-        return datetime.now()
+    """Convert various datetime strings to naive UTC datetime objects (None if unrecognizable)."""
+    return parse_date(date_string)
 
 
 def get_featured_image(post_url):
@@ -48,102 +31,210 @@ def get_featured_image(post_url):
     Fetch the Open Graph image (og:image) from the post URL.
     """
     try:
-        response = requests.get(post_url, timeout=5)  # Fetch the HTML content
+        response = http_client.get(post_url)  # Fetch the HTML content
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            og_image_tag = soup.find('meta', property='og:image')
-            if og_image_tag and og_image_tag.get('content'):
-                return og_image_tag['content']
+            page = scan_html(response.text, HEAD)
+            if page.meta_images.get('og:image'):
+                return page.meta_images['og:image']
     except Exception as e:
-        print(f"Error fetching og:image from {post_url}: {e}")
+        log.warning("Error fetching og:image from %s: %s", post_url, e)
     return None  # Return None if no og:image is found
 
 
-def discover_feed_url(base_url):
-    """Discover RSS/Atom feed URL from base URL."""
+# Probed in this order when a page links to no feed
+COMMON_FEED_PATHS = [
+    '/feed',
+    '/rss',
+    '/feed/',
+    '/rss/',
+    '/atom.xml',
+    '/feed.xml',
+    '/rss.xml',
+    '/feed/rss',
+    '/feed/atom',
+    '/rss/feed',
+    '/index.xml',
+    '/feeds',
+    '/rss/news',
+    '/rss/all',
+    '/feed/rss2',
+    '/rss/categorie/stiri',
+    '/rss/rss.xml'
+]
+
+# Guessed paths all hit the site being added, so they are probed gently
+DISCOVERY_PER_HOST_LIMIT = 2
+DISCOVERY_PER_HOST_INTERVAL = 0.2  # seconds between probe starts
+DISCOVERY_CACHE_TTL = 3600  # seconds; failed discoveries are retried sooner
+DISCOVERY_FAILURE_TTL = 300
+discovery_cache = LRUBackend(maxsize=1000)
+
+
+def cache_key(kind, url):
+    """Cache key of a site: scheme, domain and path, without query or trailing slash."""
+    parsed = urlparse(url)
+    return f"{kind}:{parsed.scheme}://{parsed.netloc.lower()}{parsed.path.rstrip('/')}"
+
+
+def looks_like_feed(content):
+    """Cheap sniff of a body's first bytes: XML, RSS or Atom rather than an HTML page."""
+    start = content[:512].lstrip().lower()
+    return not (start.startswith(b'<!doctype html') or start.startswith(b'<html'))
+
+
+def fetch_for_discovery(url, accept):
+    """
+    GET a user-supplied URL through the pinned safe_http_client.
+
+    Certificates are verified, only vetted public addresses are dialed and
+    at most HTTP_MAX_BYTES of a textual body is read.
+    """
+    response = safe_http_client.get(url, headers={'Accept': accept}, stream=True)
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
-        }
+        check_textual(response)
+        response._content = BoundedBody(response, safe_http_client.max_bytes).read_rest()
+    finally:
+        response.close()
+    return response
 
-        # First try to get the HTML and look for feed links
-        try:
-            response = requests.get(base_url, headers=headers, timeout=5, verify=False)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Look for feed links in the HTML
-            feed_links = []
-            
-            # Check link tags
-            feed_links.extend(soup.find_all('link', 
-                type=lambda t: t and ('rss' in t.lower() or 'atom' in t.lower() or 'xml' in t.lower())))
-            feed_links.extend(soup.find_all('link', 
-                rel='alternate', 
-                type=lambda t: t and ('rss' in t.lower() or 'atom' in t.lower() or 'xml' in t.lower())))
-            
-            # Check a tags
-            feed_links.extend(soup.find_all('a', 
-                href=lambda h: h and ('rss' in h.lower() or 'feed' in h.lower() or 'atom' in h.lower())))
-            
-            for link in feed_links:
-                href = link.get('href', '')
-                if href:
-                    feed_url = requests.compat.urljoin(base_url, href)
-                    if is_valid_feed_url(feed_url):
-                        print(f"Found feed URL in HTML: {feed_url}")
-                        return base_url, feed_url
-                        
-        except Exception as e:
-            print(f"Error checking HTML for feeds: {str(e)}")
-
-        # If no feed found in HTML, try common paths
-        common_paths = [
-            '/feed',
-            '/rss',
-            '/feed/',
-            '/rss/',
-            '/atom.xml',
-            '/feed.xml',
-            '/rss.xml',
-            '/feed/rss',
-            '/feed/atom',
-            '/rss/feed',
-            '/index.xml',
-            '/feeds',
-            '/rss/news',
-            '/rss/all',
-            '/feed/rss2',
-            '/rss/categorie/stiri',
-            '/rss/rss.xml'
-        ]
 
-        for path in common_paths:
-            try:
-                feed_url = requests.compat.urljoin(base_url, path)
-                print(f"Testing feed URL: {feed_url}")
-                if is_valid_feed_url(feed_url):
-                    print(f"Found valid feed URL: {feed_url}")
-                    return base_url, feed_url
-            except Exception:
-                continue
+def inspect_page(url):
+    """
+    Fetch a page once and extract what discovery needs from it.
 
-        print(f"No valid feed URL found for {base_url}")
-        return None, None
+    Returns {'ok', 'is_feed', 'feed_links', 'favicon_url'} or None when the page
+    could not be fetched. Cached for DISCOVERY_CACHE_TTL, so feed and favicon
+    discovery of the same site share one request.
+    """
+    key = cache_key('page', url)
+    cached = discovery_cache.get_many([key])
+    if key in cached:
+        return cached[key]
 
+    try:
+        response = fetch_for_discovery(url, 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8')
     except Exception as e:
-        print(f"Error discovering feed URL: {str(e)}")
+        log.warning("Error checking HTML for feeds at %s: %s", url, e)
+        discovery_cache.set_many({key: None}, DISCOVERY_FAILURE_TTL)
+        return None
+
+    page = {'ok': response.status_code == 200, 'is_feed': False, 'feed_links': [], 'favicon_url': None}
+    if page['ok'] and looks_like_feed(response.content) and is_valid_feed(response.content):
+        page['is_feed'] = True
+    else:
+        # One pass collects feed links (link tags first, then anchors) and icons
+        scan = scan_html(response.text, FULL, base_url=url)
+        for feed_url in scan.feed_links + scan.anchor_feed_links:
+            if feed_url not in page['feed_links']:
+                page['feed_links'].append(feed_url)
+
+        if page['ok'] and scan.icon_links:
+            page['favicon_url'] = scan.icon_links[0]
+
+    discovery_cache.set_many({key: page}, DISCOVERY_CACHE_TTL)
+    return page
+
+
+def first_valid_feed_url(linked, guessed=()):
+    """
+    Return the first valid feed URL, trying the page's own feed links before guessed paths.
+
+    Linked candidates are probed one at a time and the first valid one wins
+    without touching the rest. Guessed paths go through a FetchEngine, so
+    the site sees at most DISCOVERY_PER_HOST_LIMIT probes at once, spaced
+    DISCOVERY_PER_HOST_INTERVAL apart; the first valid one in list order
+    wins and the probes not yet started are dropped.
+    """
+    for url in linked:
+        if is_valid_feed_url(url):
+            return url
+
+    guessed = [url for url in guessed if url not in linked]
+    if not guessed:
+        return None
+
+    engine = FetchEngine(max_workers=DISCOVERY_PER_HOST_LIMIT, per_host_limit=DISCOVERY_PER_HOST_LIMIT,
+                         per_host_interval=DISCOVERY_PER_HOST_INTERVAL)
+    results = {}
+    probes = engine.run([FetchJob(url, url, is_valid_feed_url, url) for url in guessed])
+    try:
+        for job, valid, error in probes:
+            results[job.key] = bool(valid)
+            # A guess only wins once every guess before it has failed
+            for url in guessed:
+                if url not in results:
+                    break
+                if results[url]:
+                    return url
+        return None
+    finally:
+        probes.close()
+
+
+def discover_feed_url(base_url):
+    """Discover RSS/Atom feed URL from base URL."""
+    try:
+        key = cache_key('feed', base_url)
+        cached = discovery_cache.get_many([key])
+        if key in cached:
+            return tuple(cached[key])
+
+        with metrics.source(base_url), metrics.span('discover'):
+            page = inspect_page(base_url)
+            if page and page['is_feed']:
+                feed_url = base_url
+            else:
+                # Links found in the HTML take priority over guessed paths
+                linked = page['feed_links'] if page else []
+                guessed = [requests.compat.urljoin(base_url, path) for path in COMMON_FEED_PATHS]
+                feed_url = first_valid_feed_url(linked, guessed)
+
+        if feed_url:
+            log.info("Found valid feed URL: %s", feed_url)
+            result = (base_url, feed_url)
+            discovery_cache.set_many({key: result}, DISCOVERY_CACHE_TTL)
+        else:
+            log.info("No valid feed URL found for %s", base_url)
+            result = (None, None)
+            discovery_cache.set_many({key: result}, DISCOVERY_FAILURE_TTL)
+        return result
+
+    except Exception as e:
+        log.warning("Error discovering feed URL for %s: %s", base_url, e)
         return None, None
 
 
+def discover_favicon_url(base_url):
+    """Discover the favicon URL from the base URL, reusing the page fetched for feed discovery."""
+    try:
+        key = cache_key('favicon', base_url)
+        cached = discovery_cache.get_many([key])
+        if key in cached:
+            return cached[key]
+
+        page = inspect_page(base_url)
+        if page is None or not page['ok']:
+            return None
+
+        favicon_url = page['favicon_url']
+        if not favicon_url:
+            # Fallback to default favicon
+            default_favicon = requests.compat.urljoin(base_url, '/favicon.ico')
+            response = safe_http_client.head(default_favicon)
+            if response.status_code == 200:
+                favicon_url = default_favicon
+
+        discovery_cache.set_many({key: favicon_url}, DISCOVERY_CACHE_TTL)
+        return favicon_url
+    except Exception as e:
+        log.warning("Error discovering favicon for %s: %s", base_url, e)
+        return None
+
+
 def is_valid_feed_url(url):
     """Check if URL points to a valid RSS/Atom feed."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'application/rss+xml, application/atom+xml, application/xml, text/xml'
-        }
-        response = requests.get(url, headers=headers, timeout=5, verify=False)
+        response = fetch_for_discovery(url, 'application/rss+xml, application/atom+xml, application/xml, text/xml')
         return is_valid_feed(response.content)
     except:
         return False
@@ -196,11 +287,10 @@ def process_feeds(user_id=None):
                     continue
 
                 headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Accept': 'application/rss+xml, application/atom+xml, application/xml, text/xml'
+                                'Accept': 'application/rss+xml, application/atom+xml, application/xml, text/xml'
                 }
                 
-                response = requests.get(feed_url, headers=headers, timeout=10, verify=False)
+                response = http_client.get(feed_url, headers=headers, verify=False)
                 parsed_feed = feedparser.parse(response.content)
                 
                 if not parsed_feed.entries:
@@ -223,9 +313,10 @@ def process_feeds(user_id=None):
 
                         # Extract post details
                         post_title = entry.get("title", "Untitled")
-                        post_date_string = entry.get("published") or entry.get("updated")
-                        post_date = adjust_datetime_with_timezone(post_date_string) if post_date_string else None
-                        post_content = strip_html(entry.get("summary", "") or entry.get("content", [{"value": ""}])[0]["value"])
+                        # Undated entries are dated when first seen, like in the ingest worker
+                        post_date = entry_date(entry, base_url) or datetime.utcnow()
+                        post_content, post_snippet = clean_post_content(
+                            entry.get("summary", "") or entry.get("content", [{"value": ""}])[0]["value"], base_url=post_url)
                         post_featured_image_url = get_featured_image(post_url)
 
                         new_post = RSSFeedContent(
@@ -233,6 +324,7 @@ def process_feeds(user_id=None):
                             post_title=post_title[:255],
                             post_date=post_date,
                             post_content=post_content,
+                            post_snippet=post_snippet,
                             post_featured_image_url=post_featured_image_url,
                             post_url=post_url
                         )
@@ -287,12 +379,11 @@ def process_feeds_old(user_id=None):
                 base_url, feed_url = discover_feed_url(feed.url)
                 
                 headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Accept': 'application/xml, application/rss+xml, text/xml, */*'
+                                'Accept': 'application/xml, application/rss+xml, text/xml, */*'
                 }
                 
                 # Use feed_url for fetching
-                response = requests.get(str(feed_url), headers=headers, timeout=10, verify=False)
+                response = http_client.get(str(feed_url), headers=headers, verify=False)
                 
                 parsed_feed = feedparser.parse(response.content)
                 
@@ -316,9 +407,10 @@ def process_feeds_old(user_id=None):
 
                         # Extract post details
                         post_title = entry.get("title", "Untitled")
-                        post_date_string = entry.get("published") or entry.get("updated")
-                        post_date = adjust_datetime_with_timezone(post_date_string) if post_date_string else None
-                        post_content = strip_html(entry.get("summary", "") or entry.get("content", [{"value": ""}])[0]["value"])
+                        # Undated entries are dated when first seen, like in the ingest worker
+                        post_date = entry_date(entry, base_url) or datetime.utcnow()
+                        post_content, post_snippet = clean_post_content(
+                            entry.get("summary", "") or entry.get("content", [{"value": ""}])[0]["value"], base_url=post_url)
                         post_featured_image_url = get_featured_image(post_url)
 
                         new_post = RSSFeedContent(
@@ -326,6 +418,7 @@ def process_feeds_old(user_id=None):
                             post_title=post_title[:255],
                             post_date=post_date,
                             post_content=post_content,
+                            post_snippet=post_snippet,
                             post_featured_image_url=post_featured_image_url,
                             post_url=post_url
                         )
@@ -383,44 +476,78 @@ def process_feeds_old(user_id=None):
 
     return results
 
-def fix_existing_feed_base_urls():
-    """One-time fix for existing feed base URLs in the database."""
+FIX_FEED_URLS_MIGRATION = 'fix-feed-base-urls'
+
+def fix_existing_feed_base_urls(max_workers=8, per_host_limit=1, retry_failed=False, restart=False):
+    """
+    Point stored posts at the base URL their feed is discovered under.
+
+    Resumable: every processed feed URL is recorded in migration_progress and
+    skipped by the next run, so an interrupted run picks up where it stopped.
+    Discovery runs concurrently (per-host limited); the database is only
+    touched from the calling thread, one commit per feed URL.
+    """
     try:
-        # Get all unique feed base URLs
-        unique_feeds = db.session.query(RSSFeedContent.feed_base_url).distinct().all()
-        
-        for (feed_url,) in unique_feeds:
-            base_url, _ = discover_feed_url(feed_url)
-            if base_url and base_url != feed_url:
-                # Update all entries with this feed base URL
-                RSSFeedContent.query.filter_by(feed_base_url=feed_url).update(
-                    {"feed_base_url": base_url}
-                )
-        
-        db.session.commit()
-        print("✅ Successfully fixed existing feed base URLs")
-        
+        if restart:
+            MigrationProgress.query.filter_by(migration=FIX_FEED_URLS_MIGRATION).delete()
+            db.session.commit()
+
+        skip_statuses = ['done'] if retry_failed else ['done', 'failed']
+        processed = {
+            item for (item,) in db.session.query(MigrationProgress.item).filter(
+                MigrationProgress.migration == FIX_FEED_URLS_MIGRATION,
+                MigrationProgress.status.in_(skip_statuses)
+            )
+        }
+        feed_urls = [
+            feed_url for (feed_url,) in db.session.query(RSSFeedContent.feed_base_url).distinct()
+            if feed_url not in processed
+        ]
+        print(f"🔧 Fixing feed base URLs: {len(feed_urls)} to check, {len(processed)} already processed")
+
+        engine = FetchEngine(max_workers=max_workers, per_host_limit=per_host_limit)
+        jobs = [FetchJob(feed_url, feed_url, discover_feed_url, feed_url) for feed_url in feed_urls]
+        fixed = failed = 0
+
+        for job, result, error in engine.run(jobs):
+            feed_url = job.key
+            base_url, discovered_url = result if result else (None, None)
+
+            try:
+                if base_url and base_url != feed_url:
+                    # Posts already stored under the new URL win over their old copies
+                    existing = db.session.query(RSSFeedContent.post_url_hash)\
+                        .filter_by(feed_base_url=base_url)
+                    RSSFeedContent.query.filter(
+                        RSSFeedContent.feed_base_url == feed_url,
+                        RSSFeedContent.post_url_hash.in_(existing)
+                    ).delete(synchronize_session=False)
+                    RSSFeedContent.query.filter_by(feed_base_url=feed_url).update(
+                        {"feed_base_url": base_url}, synchronize_session=False
+                    )
+                    fixed += 1
+
+                status = 'done' if base_url else 'failed'
+                if status == 'failed':
+                    failed += 1
+                progress = db.session.get(MigrationProgress, (FIX_FEED_URLS_MIGRATION, feed_url))
+                if progress is None:
+                    progress = MigrationProgress(migration=FIX_FEED_URLS_MIGRATION, item=feed_url, attempts=0)
+                    db.session.add(progress)
+                progress.status = status
+                progress.result = discovered_url if base_url else str(error or 'no feed found')[:255]
+                progress.attempts += 1
+                db.session.commit()
+            except Exception as e:
+                print(f"❌ Error fixing feed base URL {feed_url}: {str(e)}")
+                db.session.rollback()
+
+        print(f"✅ Fixed feed base URLs: {len(feed_urls)} checked, {fixed} updated, {failed} failed")
+
     except Exception as e:
         print(f"❌ Error fixing feed base URLs: {str(e)}")
         db.session.rollback()
 
 def strip_html(html_content):
     """Remove HTML tags and decode HTML entities from content."""
-    if not html_content:
-        return ""
-    
-    try:
-        # Remove HTML tags
-        soup = BeautifulSoup(html_content, 'html.parser')
-        text = soup.get_text(separator=' ', strip=True)
-        
-        # Replace multiple spaces with single space
-        text = ' '.join(text.split())
-        
-        # Decode HTML entities
-        text = BeautifulSoup(text, 'html.parser').get_text()
-        
-        return text
-    except Exception as e:
-        print(f"Error stripping HTML: {str(e)}")
-        return html_content
\ No newline at end of file
+    return html_to_text(html_content)
@@ -0,0 +1,171 @@
+from datetime import datetime
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateColumn
+from models import db, RSSFeedContent, post_url_hash
+from dashboardstats import ensure_dashboard_counts
+
+# post_url_hash values filled in per transaction
+HASH_BATCH_SIZE = 1000
+
+
+def missing_columns(inspector):
+    """(table, column) for every model column the database table lacks; tables that do not exist are skipped."""
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                yield table, column
+
+
+def add_column_sql(table, column, dialect):
+    """ALTER TABLE ... ADD COLUMN that works on a table with rows in it (MariaDB and SQLite)."""
+    sql = f"ALTER TABLE {dialect.identifier_preparer.format_table(table)} ADD COLUMN {CreateColumn(column).compile(dialect=dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        # Existing rows need a value for NOT NULL columns; new ones get the model default anyway
+        literal = sa.literal(default).compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+        sql += f" DEFAULT {literal}"
+    return sql
+
+
+def missing_indexes(inspector):
+    """Named indexes and unique constraints of the models the database tables lack, as sa.Index objects."""
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        existing |= {constraint['name'] for constraint in inspector.get_unique_constraints(table.name)}
+
+        wanted = list(table.indexes)
+        # A unique index enforces the same as the constraint and can be added to a table on every backend
+        wanted += [sa.Index(constraint.name, *constraint.columns, unique=True)
+                   for constraint in table.constraints
+                   if isinstance(constraint, sa.UniqueConstraint) and constraint.name]
+        for index in wanted:
+            if index.name not in existing:
+                yield index
+
+
+def stale_foreign_keys(inspector):
+    """(table, name) of named foreign keys in the database that the models no longer declare."""
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        declared = {
+            (tuple(fk.parent.name for fk in constraint.elements),
+             constraint.referred_table.name,
+             tuple(fk.column.name for fk in constraint.elements))
+            for constraint in table.foreign_key_constraints
+        }
+        for fk in inspector.get_foreign_keys(table.name):
+            key = (tuple(fk['constrained_columns']), fk['referred_table'], tuple(fk['referred_columns']))
+            if fk.get('name') and key not in declared:
+                yield table, fk['name']
+
+
+def drop_foreign_key_sql(table, name, dialect):
+    preparer = dialect.identifier_preparer
+    keyword = 'FOREIGN KEY' if dialect.name in ('mysql', 'mariadb') else 'CONSTRAINT'
+    return f"ALTER TABLE {preparer.format_table(table)} DROP {keyword} {preparer.quote(name)}"
+
+
+def backfill_post_url_hashes():
+    """Hash the post URLs stored before post_url_hash existed. Returns the number of posts updated."""
+    updated = 0
+    while True:
+        rows = db.session.query(RSSFeedContent.id, RSSFeedContent.post_url)\
+            .filter(RSSFeedContent.post_url_hash.is_(None))\
+            .limit(HASH_BATCH_SIZE)\
+            .all()
+        if not rows:
+            return updated
+        db.session.execute(
+            sa.update(RSSFeedContent.__table__)
+            .where(RSSFeedContent.__table__.c.id == sa.bindparam('post_id'))
+            .values(post_url_hash=sa.bindparam('url_hash')),
+            [{'post_id': post_id, 'url_hash': post_url_hash(post_url)} for post_id, post_url in rows]
+        )
+        db.session.commit()
+        updated += len(rows)
+
+
+def date_undated_posts():
+    """Date posts stored without a post_date by when they were first seen; returns the number updated."""
+    updated = RSSFeedContent.query.filter(RSSFeedContent.post_date.is_(None)).update(
+        {'post_date': db.func.coalesce(RSSFeedContent.created_at, datetime.utcnow())},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return updated
+
+
+def delete_duplicate_posts():
+    """Keep the oldest row of every (feed_base_url, post_url_hash); returns the number of rows deleted."""
+    duplicates = db.session.query(
+        RSSFeedContent.feed_base_url, RSSFeedContent.post_url_hash, db.func.min(RSSFeedContent.id)
+    ).group_by(
+        RSSFeedContent.feed_base_url, RSSFeedContent.post_url_hash
+    ).having(db.func.count(RSSFeedContent.id) > 1).all()
+
+    deleted = 0
+    for feed_base_url, url_hash, keep_id in duplicates:
+        deleted += RSSFeedContent.query.filter(
+            RSSFeedContent.feed_base_url == feed_base_url,
+            RSSFeedContent.post_url_hash == url_hash,
+            RSSFeedContent.id != keep_id
+        ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def upgrade_schema():
+    """
+    Bring a database created by an older version up to the models; safe to run again.
+
+    create_all() adds missing tables but never touches existing ones, so
+    this adds their new columns, drops foreign keys the models no longer
+    declare (posts used to cascade from rss_feed.url), fills in
+    post_url_hash, dates the posts stored without a post_date (the
+    timeline skips them), removes the duplicate posts the unique key would
+    reject, adds the missing indexes and builds the dashboard rollups. Every step checks the live schema
+    first, so an interrupted run is simply started again.
+    """
+    engine = db.engine
+    db.create_all()
+
+    for table, column in list(missing_columns(sa.inspect(engine))):
+        with engine.begin() as connection:
+            connection.execute(sa.text(add_column_sql(table, column, engine.dialect)))
+        print(f"➕ Added {table.name}.{column.name}")
+
+    if engine.dialect.name != 'sqlite':  # SQLite cannot drop constraints and does not enforce them by default
+        for table, name in list(stale_foreign_keys(sa.inspect(engine))):
+            with engine.begin() as connection:
+                connection.execute(sa.text(drop_foreign_key_sql(table, name, engine.dialect)))
+            print(f"✂️ Dropped foreign key {name} on {table.name}")
+
+    hashed = backfill_post_url_hashes()
+    if hashed:
+        print(f"🔑 Hashed {hashed} post URLs")
+
+    dated = date_undated_posts()
+    if dated:
+        print(f"📅 Dated {dated} undated posts by when they were stored")
+
+    indexes = list(missing_indexes(sa.inspect(engine)))
+    if any(index.unique for index in indexes):
+        deleted = delete_duplicate_posts()
+        if deleted:
+            print(f"🧹 Deleted {deleted} duplicate posts")
+
+    for index in indexes:
+        index.create(engine)
+        print(f"📇 Added index {index.name} on {index.table.name}")
+
+    if ensure_dashboard_counts():
+        print("📊 Dashboard counts rebuilt from the stored posts")
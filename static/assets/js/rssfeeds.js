@@ -2,22 +2,28 @@ document.addEventListener('DOMContentLoaded', function () {
     const postsContainer = document.getElementById('posts-container');
     if (!postsContainer) return;
 
-    let page = 1;
+    // Post fields are plain text from the feeds; escape them before they go into markup
+    function escapeHtml(value) {
+        return String(value ?? '').replace(/[&<>"']/g, ch => ({
+            '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+        })[ch]);
+    }
+
+    // The first window is rendered by the server; continue from its cursor.
+    // Empty cursor = first page; the API hands back the next one.
+    let cursor = postsContainer.children.length === 0 ? ''
+        : (postsContainer.dataset.hasMore === 'true' ? postsContainer.dataset.nextCursor : null);
     let isLoading = false;
-    let loadedPages = new Set(); // Prevent duplicate API calls
+    let loadedCursors = new Set(); // Prevent duplicate API calls
 
     function loadMorePosts() {
-        if (isLoading || loadedPages.has(page)) return; // Skip duplicate page requests
+        if (isLoading || cursor === null || loadedCursors.has(cursor)) return; // Skip duplicate requests
         isLoading = true;
-        loadedPages.add(page); // Mark this page as loaded
+        loadedCursors.add(cursor); // Mark this cursor as loaded
 
-        console.log(`Fetching Page: ${page}`); // Debugging
-
-        fetch(`/rssfeeds/api?page=${page}`)
+        fetch(`/rssfeeds/api?cursor=${encodeURIComponent(cursor)}`)
             .then(response => response.json())
             .then(data => {
-                console.log(`API Response (Page ${page}):`, data.posts.map(p => p.id)); // Debugging
-
                 if (!data.posts || data.posts.length === 0) {
                     console.log("No more posts to load.");
                     window.removeEventListener('scroll', onScroll); // Stop scrolling event
@@ -29,34 +35,34 @@ document.addEventListener('DOMContentLoaded', function () {
                     const card = `
                         <div class="fixed masonry-item">
                             <div class="card mb-3 shadow-sm">
-                                <img class="post_image" src="${post.image_url || '/static/assets/img/default-placeholder.png'}"
+                                <img class="post_image" src="${escapeHtml(post.image_url || '/static/assets/img/default-placeholder.png')}"
                                      class="card-img-top"
-                                     alt="${post.title}"
+                                     alt="${escapeHtml(post.title)}"
                                      onerror="this.onerror=null; this.src='/static/assets/img/default-placeholder.png';">
                                 <div class="card-body">
                                     <!-- Favicon & Base URL -->
                                     <div class="d-flex align-items-center mb-2">
-                                        <img src="${post.favicon_url || '/static/assets/img/favicon.png'}" 
+                                        <img src="${escapeHtml(post.favicon_url || '/static/assets/img/favicon.png')}" 
                                              alt="Favicon" 
                                              width="16" 
                                              height="16" 
                                              class="me-2">
-                                        <small class="text-muted">${sourceBaseUrl}</small>
+                                        <small class="text-muted">${escapeHtml(sourceBaseUrl)}</small>
                                     </div>
 
                                     <!--  Moved "Posted on" section BELOW source -->
                                     <div class="mb-2">
-                                        <small class="text-muted">Posted on ${post.post_date}</small>
+                                        <small class="text-muted">Posted on ${escapeHtml(post.post_date)}</small>
                                     </div>
 
                                     <!--  Post Title -->
                                     <h5 class="card-title">
-                                        <a href="${post.url}" target="_blank" class="post-link" data-url="${post.url}">
-                                            ${post.title}
+                                        <a href="${escapeHtml(post.url)}" target="_blank" class="post-link" data-url="${escapeHtml(post.url)}">
+                                            ${escapeHtml(post.title)}
                                         </a>
                                     </h5>
 
-                                    <p class="card-text">${post.content}</p>
+                                    <p class="card-text">${escapeHtml(post.content)}</p>
                                 </div>
                             </div>
                         </div>`;
@@ -64,8 +70,9 @@ document.addEventListener('DOMContentLoaded', function () {
                 });
 
                 if (data.has_more) {
-                    page++; 
+                    cursor = data.next_cursor;
                 } else {
+                    cursor = null;
                     console.log("🛑 No more pages available.");
                     window.removeEventListener('scroll', onScroll);
                 }
@@ -141,6 +148,21 @@ document.addEventListener('DOMContentLoaded', function () {
 
 
 
+    // New articles are pushed by the server as soon as they are stored
+    const newArticlesBtn = document.getElementById('newArticlesBtn');
+    if (window.EventSource && newArticlesBtn) {
+        const updates = new EventSource('/rssfeeds/stream');
+        updates.addEventListener('new_articles', () => {
+            newArticlesBtn.style.display = 'block';
+        });
+        newArticlesBtn.addEventListener('click', () => window.location.reload());
+        window.addEventListener('beforeunload', () => updates.close());
+    }
+
     window.addEventListener('scroll', onScroll);
-    loadMorePosts();
+    if (cursor === '') {
+        loadMorePosts();
+    } else {
+        onScroll(); // The first window may not fill the screen
+    }
 });
\ No newline at end of file
@@ -2,15 +2,22 @@ document.addEventListener('DOMContentLoaded', function () {
     const postsContainer = document.getElementById('posts-container');
     if (!postsContainer) return;
 
-    let page = 1;
+    // Post fields are plain text from the feeds; escape them before they go into markup
+    function escapeHtml(value) {
+        return String(value ?? '').replace(/[&<>"']/g, ch => ({
+            '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+        })[ch]);
+    }
+
+    let cursor = '';  // Empty cursor = first page; the API hands back the next one
     let isLoading = false;
     let loadedPostUrls = new Set();  // Track loaded URLs to prevent duplicates
 
     function loadMorePosts() {
-        if (isLoading) return;
+        if (isLoading || cursor === null) return;
         isLoading = true;  // Prevent multiple requests
 
-        fetch(`/rssfeeds/api?page=${page}`)
+        fetch(`/rssfeeds/api?cursor=${encodeURIComponent(cursor)}`)
             .then(response => response.json())
             .then(data => {
                 if (!data.posts || data.posts.length === 0) return;
@@ -24,27 +31,27 @@ document.addEventListener('DOMContentLoaded', function () {
                     const card = `
                         <div class="col-md-4">
                             <div class="card mb-3 shadow-sm">
-                                <img src="${post.image_url || '/static/assets/img/default-placeholder.png'}"
+                                <img src="${escapeHtml(post.image_url || '/static/assets/img/default-placeholder.png')}"
                                      class="card-img-top"
-                                     alt="${post.title}"
+                                     alt="${escapeHtml(post.title)}"
                                      onerror="this.onerror=null; this.src='/static/assets/img/default-placeholder.png';">
                                 <div class="card-body">
                                     <div class="d-flex align-items-center mb-2">
-                                        <img src="${post.favicon_url || '/static/assets/img/default-favicon.png'}" 
+                                        <img src="${escapeHtml(post.favicon_url || '/static/assets/img/default-favicon.png')}" 
                                              alt="Favicon" 
                                              width="16" 
                                              height="16" 
                                              class="me-2">
-                                        <small class="text-muted">${sourceBaseUrl}</small>
+                                        <small class="text-muted">${escapeHtml(sourceBaseUrl)}</small>
                                     </div>
                                     <h5 class="card-title">
-                                        <a href="${post.url}" target="_blank" class="post-link" data-url="${post.url}">
-                                            ${post.title}
+                                        <a href="${escapeHtml(post.url)}" target="_blank" class="post-link" data-url="${escapeHtml(post.url)}">
+                                            ${escapeHtml(post.title)}
                                         </a>
                                     </h5>
-                                    <p class="card-text">${post.content}</p>
+                                    <p class="card-text">${escapeHtml(post.content)}</p>
                                     <p class="card-text">
-                                        <small class="text-muted">Posted on ${post.post_date}</small>
+                                        <small class="text-muted">Posted on ${escapeHtml(post.post_date)}</small>
                                     </p>
                                 </div>
                             </div>
@@ -53,9 +60,10 @@ document.addEventListener('DOMContentLoaded', function () {
                 });
 
                 if (data.has_more) {
-                    page++;
+                    cursor = data.next_cursor;
                     isLoading = false; // ✅ Allow the next fetch only after response
                 } else {
+                    cursor = null;
                     window.removeEventListener('scroll', onScroll); // ✅ Stop unnecessary requests
                 }
             })
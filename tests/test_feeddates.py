@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import feedparser
+
+from feeddates import DateParser
+
+
+def test_named_central_european_zone_is_applied():
+    assert DateParser().parse('Mon, 02 Jan 2006 15:04:05 CEST') == datetime(2006, 1, 2, 13, 4, 5)
+
+
+def test_unknown_zone_name_is_rejected_not_read_as_utc():
+    assert DateParser().parse('Mon, 02 Jan 2006 15:04:05 XYZ') is None
+
+
+def test_entry_date_does_not_trust_feedparser_for_named_zones():
+    entries = feedparser.parse(
+        '<rss version="2.0"><channel>'
+        '<item><pubDate>Mon, 02 Jan 2006 15:04:05 CEST</pubDate></item>'
+        '<item><pubDate>Mon, 02 Jan 2006 15:04:05 GMT</pubDate></item>'
+        '</channel></rss>'
+    ).entries
+    parser = DateParser()
+    assert parser.entry_date(entries[0]) == datetime(2006, 1, 2, 13, 4, 5)
+    assert parser.entry_date(entries[1]) == datetime(2006, 1, 2, 15, 4, 5)
@@ -0,0 +1,30 @@
+from htmltext import clean_post_content
+
+
+def test_end_of_disallowed_block_closes_tags_opened_inside_it():
+    assert clean_post_content('<div><b>x</div>y') == ('<b>x</b>y', 'x y')
+
+
+def test_self_closed_disallowed_tag_leaves_the_open_tags_alone():
+    assert clean_post_content('<b>x<div/>y</b>') == ('<b>xy</b>', 'x y')
+
+
+def test_javascript_and_data_urls_are_dropped():
+    safe_html, _ = clean_post_content(
+        '<a href="javascript:alert(1)">x</a><img src="data:image/png;base64,AAAA">', base_url='https://news.example/')
+    assert safe_html == '<a rel="nofollow noopener" target="_blank">x</a>'
+
+
+def test_script_and_style_are_dropped_with_their_content():
+    assert clean_post_content('<p>a<script>alert(1)</script><style>p{color:red}</style>b</p>') == ('<p>ab</p>', 'ab')
+
+
+def test_only_allowed_attributes_are_kept():
+    safe_html, _ = clean_post_content('<p class="x" style="y" onclick="z">t</p><img src="https://news.example/a.png" alt="A" onerror="x">')
+    assert safe_html == '<p>t</p><img src="https://news.example/a.png" alt="A">'
+
+
+def test_relative_urls_are_resolved_against_base_url():
+    safe_html, _ = clean_post_content('<a href="/post">l</a><img src="pics/a.png">', base_url='https://news.example/feed/')
+    assert safe_html == ('<a href="https://news.example/post" rel="nofollow noopener" target="_blank">l</a>'
+                         '<img src="https://news.example/feed/pics/a.png">')
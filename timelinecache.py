@@ -0,0 +1,131 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # Optional: only needed when TIMELINE_CACHE_URL is set
+    redis = None
+
+log = logging.getLogger('instanews.cache')
+
+
+class LRUBackend:
+    """Bounded in-process cache; least recently used keys are evicted first."""
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                item = self._data.get(key)
+                if item is None:
+                    continue
+                expires_at, value = item
+                if expires_at < now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, mapping, ttl):
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = (expires_at, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class RedisBackend:
+    """Shared cache on a Redis-compatible server, so invalidations reach every process."""
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        values = self.client.mget(keys)
+        return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, mapping, ttl):
+        pipe = self.client.pipeline()
+        for key, value in mapping.items():
+            pipe.setex(key, ttl, json.dumps(value))
+        pipe.execute()
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+
+class TimelineCache:
+    """
+    Per-user timelines and shared post cards.
+
+    A timeline is the user's feed -> favicon map plus the ordered
+    `[post_date, post_id]` list of their newest `depth` posts. Cards are the
+    serialized posts, keyed by id and shared between users following the same
+    source. Entries expire after `ttl` seconds. A `shared` cache is the one
+    the ingest worker invalidates; with the in-process backend, callers
+    compare the user's ingest watermark on read instead, and cards of posts
+    still waiting for their image are not cached.
+    """
+
+    def __init__(self, timelines, cards, ttl=60, depth=500, shared=False):
+        self.timelines = timelines
+        self.cards = cards
+        self.ttl = ttl
+        self.depth = depth
+        self.shared = shared
+
+    def get_timeline(self, user_id):
+        key = f"timeline:{user_id}"
+        return self.timelines.get_many([key]).get(key)
+
+    def set_timeline(self, user_id, timeline):
+        self.timelines.set_many({f"timeline:{user_id}": timeline}, self.ttl)
+
+    def get_cards(self, post_ids):
+        found = self.cards.get_many([f"card:{post_id}" for post_id in post_ids])
+        return {int(key.split(':', 1)[1]): card for key, card in found.items()}
+
+    def set_cards(self, cards):
+        self.cards.set_many({f"card:{post_id}": card for post_id, card in cards.items()}, self.ttl)
+
+    def invalidate_users(self, user_ids):
+        self.timelines.delete(*[f"timeline:{user_id}" for user_id in user_ids])
+
+    def invalidate_posts(self, post_ids):
+        self.cards.delete(*[f"card:{post_id}" for post_id in post_ids])
+
+
+def create_timeline_cache(config):
+    """Build the cache from TIMELINE_CACHE_* settings, falling back to in-process LRUs."""
+    url = config.get('TIMELINE_CACHE_URL')
+    ttl = config['TIMELINE_CACHE_TTL']
+    depth = config['TIMELINE_CACHE_DEPTH']
+
+    if url:
+        if redis is not None:
+            backend = RedisBackend(url)
+            return TimelineCache(backend, backend, ttl=ttl, depth=depth, shared=True)
+        log.warning("TIMELINE_CACHE_URL is set but the redis package is not installed, using in-process cache")
+
+    size = config['TIMELINE_CACHE_SIZE']
+    return TimelineCache(LRUBackend(size), LRUBackend(size * 100), ttl=ttl, depth=depth)
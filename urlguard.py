@@ -0,0 +1,125 @@
+import ipaddress
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+import tldextract
+
+# Bundled Public Suffix List snapshot: never fetched over the network, loaded once
+suffix_extractor = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+
+ALLOWED_URL_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz'
+                              'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+                              '0123456789-._~:/?#[]@!$&\'()*+,;=')
+
+
+class UnsafeAddressError(OSError):
+    """Raised when a host does not resolve, or resolves to a non-public address."""
+
+
+def is_public_ip(ip_str):
+    ip = ipaddress.ip_address(ip_str)
+    return not (ip.is_private or ip.is_loopback or
+                ip.is_link_local or ip.is_multicast or
+                ip.is_reserved or ip.is_unspecified)
+
+
+class ResolutionCache:
+    """
+    Vetted DNS answers per host, kept for `ttl` seconds.
+
+    A host is cached only as a whole: either every address it resolves to
+    is public, or the host is remembered as unsafe for `failure_ttl`
+    seconds. Connections made through the pinned HTTP client dial these
+    addresses, so the address that was checked is the one connected to.
+    At most `maxsize` hosts are kept, least recently used first out, and
+    expired answers are dropped as new ones come in.
+    """
+
+    def __init__(self, ttl=300, failure_ttl=60, maxsize=10000):
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, host):
+        """Public addresses of `host`; raises UnsafeAddressError otherwise."""
+        host = host.rstrip('.').lower()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(host)
+        if entry and entry[0] > now:
+            addresses, error = entry[1], entry[2]
+        else:
+            addresses, error = self._lookup(host)
+            ttl = self.ttl if addresses else self.failure_ttl
+            self._store(host, (now + ttl, addresses, error), now)
+
+        if error:
+            raise UnsafeAddressError(error)
+        return addresses
+
+    def _store(self, host, entry, now):
+        with self._lock:
+            self._entries[host] = entry
+            self._entries.move_to_end(host)
+            # Least recently used first: stop at the first answer still valid
+            while self._entries:
+                oldest = next(iter(self._entries.values()))
+                if oldest[0] > now and len(self._entries) <= self.maxsize:
+                    break
+                self._entries.popitem(last=False)
+
+    def _lookup(self, host):
+        try:
+            infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+        except socket.gaierror as e:
+            return [], f"{host} does not resolve: {e}"
+
+        addresses = []
+        for info in infos:
+            ip_str = info[4][0]
+            if not is_public_ip(ip_str):
+                return [], f"{host} resolves to non-public address {ip_str}"
+            if ip_str not in addresses:
+                addresses.append(ip_str)
+        return addresses, None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+resolution_cache = ResolutionCache()
+
+
+def is_valid_public_url(url):
+    """
+    Validate if a URL is safe to make requests to.
+    Prevents SSRF by checking for private IPs and invalid domains.
+    """
+    try:
+        # URL length and allowed characters
+        if len(url) > 2048 or not all(c in ALLOWED_URL_CHARS for c in url):
+            return False
+
+        parsed = urlparse(url)
+        if parsed.scheme not in ['http', 'https']:
+            return False
+
+        # Validate domain format and TLD
+        domain = parsed.hostname
+        if not domain or '.' not in domain:
+            return False
+        if not suffix_extractor(url).suffix:
+            return False
+
+        # Every address the domain resolves to must be public (cached)
+        resolution_cache.resolve(domain)
+        return True
+    except Exception:
+        return False